@@ -1,6 +1,16 @@
 # banner.py
+import asyncio
 import socket
 
+# Services that greet the client as soon as the connection is up
+SERVER_FIRST_PORTS = {21, 22, 23, 25, 110, 143, 465, 587, 993, 995, 3306, 5900}
+# Plain-text HTTP services; these get a HEAD request
+HTTP_PORTS = {80, 81, 591, 3000, 5000, 8000, 8008, 8080, 8081, 8888}
+
+BANNER_TIMEOUT = 2
+# How long an unknown service gets to speak first before we nudge it
+GREETING_WAIT = 0.5
+
 def grab_banner(target, port):
     try:
         sock = socket.socket()
@@ -10,4 +20,64 @@ def grab_banner(target, port):
         sock.close()
         return banner.strip()
     except:
-        return None
\ No newline at end of file
+        return None
+
+async def grab_banner_async(sock, host, port, timeout=BANNER_TIMEOUT):
+    """
+    Reads a banner over an already connected non-blocking socket (e.g. the
+    one handed over by scanner.ConnectEngine), choosing the probe by port:
+    wait for the greeting on server-first protocols, send HEAD on HTTP
+    ports, and otherwise wait briefly before sending a bare CRLF.
+    Always closes the socket. Returns the banner text or None.
+    """
+    try:
+        reader, writer = await asyncio.open_connection(sock=sock)
+    except OSError:
+        sock.close()
+        return None
+
+    try:
+        if port in HTTP_PORTS:
+            writer.write(f"HEAD / HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+            return http_banner(await _read(reader, timeout))
+
+        if port in SERVER_FIRST_PORTS:
+            return _text(await _read(reader, timeout))
+
+        data = await _read(reader, GREETING_WAIT)
+        if not data:
+            writer.write(b"\r\n")
+            await writer.drain()
+            data = await _read(reader, timeout)
+        return _text(data)
+    except OSError:
+        return None
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+
+def http_banner(data):
+    """Server header of an HTTP response, else its status line."""
+    text = _text(data)
+    if not text:
+        return None
+    lines = text.splitlines()
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "server":
+            return value.strip()
+    return lines[0]
+
+async def _read(reader, timeout):
+    try:
+        return await asyncio.wait_for(reader.read(1024), timeout=timeout)
+    except asyncio.TimeoutError:
+        return b""
+
+def _text(data):
+    text = data.decode(errors="ignore").strip() if data else ""
+    return text or None
@@ -0,0 +1,167 @@
+# ble_backend.py
+import asyncio
+import random
+
+
+class DeviceNotFound(Exception):
+    """The device is no longer reachable (stopped advertising, out of range)."""
+
+
+class BleakBackend:
+    """
+    BLE access through bleak: discovery and GATT enumeration. Everything
+    the scanner needs from the radio goes through a backend, so the scanner
+    can run against SimulatedBackend without an adapter.
+    """
+
+    def __init__(self):
+        # Imported here so the simulated backend works without bleak installed
+        import bleak
+        from bleak.exc import BleakDeviceNotFoundError
+
+        self.bleak = bleak
+        self.not_found_error = BleakDeviceNotFoundError
+
+    async def discover(self, timeout):
+        raw_devices = await self.bleak.BleakScanner.discover(timeout=timeout, return_adv=True)
+        return [device_record(device, adv) for device, adv in raw_devices.values()]
+
+    async def monitor(self, on_detect, stop):
+        """
+        Scans until `stop` (an asyncio.Event) is set, calling
+        on_detect(device record) for every advertisement received.
+        """
+        def callback(device, adv):
+            on_detect(device_record(device, adv))
+
+        async with self.bleak.BleakScanner(detection_callback=callback):
+            await stop.wait()
+
+    async def enumerate(self, ble_device, timeout):
+        """
+        Connects and returns {"services": [...], "characteristics": [...]}.
+        Raises DeviceNotFound, asyncio.TimeoutError or the bleak error.
+        """
+        profile = {"services": [], "characteristics": []}
+
+        try:
+            async with self.bleak.BleakClient(ble_device, timeout=timeout) as client:
+                # In Bleak 1.x services are populated automatically
+                for service in client.services or ():
+                    profile["services"].append(str(service.uuid))
+                    for char in service.characteristics:
+                        profile["characteristics"].append(str(char.uuid))
+        except self.not_found_error as e:
+            raise DeviceNotFound(str(e))
+
+        return profile
+
+
+def device_record(device, adv):
+    """The scanner's view of one advertising device."""
+    return {
+        "ble_device": device,
+        "name": device.name or "Unknown",
+        "address": device.address,
+        "rssi": adv.rssi,
+        "manufacturer_ids": sorted(adv.manufacturer_data),
+        "advertised_services": list(adv.service_uuids)
+    }
+
+
+# -------------------------------------------------
+# Simulated radio (testing / benchmarking without hardware)
+# -------------------------------------------------
+class SimulatedDevice:
+    def __init__(self, address, name, rssi, services, manufacturer_ids=()):
+        self.address = address
+        self.name = name
+        self.rssi = rssi
+        self.services = services
+        self.manufacturer_ids = list(manufacturer_ids)
+
+
+class SimulatedAdvertisement:
+    def __init__(self, device):
+        self.rssi = device.rssi
+        self.manufacturer_data = {company: b"" for company in device.manufacturer_ids}
+        self.service_uuids = list(device.services)[:2]
+
+
+class SimulatedBackend:
+    """
+    Stand-in radio with configurable connection latency and failures.
+
+    latency: (min, max) seconds per connection
+    failure_rate: chance an attempt times out
+    missing_rate: chance a device has vanished by the time it is connected
+    """
+
+    SERVICES = (
+        ["00001800-0000-1000-8000-00805f9b34fb", "00001801-0000-1000-8000-00805f9b34fb",
+         "0000180f-0000-1000-8000-00805f9b34fb"],
+        ["00001800-0000-1000-8000-00805f9b34fb", "00001812-0000-1000-8000-00805f9b34fb",
+         "0000180a-0000-1000-8000-00805f9b34fb"],
+        ["00001800-0000-1000-8000-00805f9b34fb", "0000180d-0000-1000-8000-00805f9b34fb"]
+    )
+    # Device Name, Appearance
+    CHARACTERISTICS = ("00002a00-0000-1000-8000-00805f9b34fb", "00002a01-0000-1000-8000-00805f9b34fb")
+    MANUFACTURERS = ((0x004C,), (0x0075,), (0x0006,), ())
+
+    def __init__(self, count=20, latency=(0.5, 3.0), failure_rate=0.1, missing_rate=0.02, seed=None):
+        self.random = random.Random(seed)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.missing_rate = missing_rate
+        self.connects = 0
+        self.active = 0
+        self.peak_active = 0
+        self.devices = [
+            SimulatedDevice(
+                address=f"SI:MU:LA:TE:{n // 256:02X}:{n % 256:02X}",
+                name=f"sim-{n}",
+                rssi=self.random.randint(-95, -40),
+                services=self.SERVICES[n % len(self.SERVICES)],
+                manufacturer_ids=self.MANUFACTURERS[n % len(self.MANUFACTURERS)]
+            )
+            for n in range(count)
+        ]
+
+    async def discover(self, timeout):
+        await asyncio.sleep(min(timeout, 0.1))
+        return [device_record(device, SimulatedAdvertisement(device)) for device in self.devices]
+
+    async def monitor(self, on_detect, stop, interval=0.05):
+        # Devices come into range one by one, then keep advertising with
+        # drifting RSSI
+        visible = 0
+        while not stop.is_set():
+            visible = min(visible + 1, len(self.devices))
+            device = self.devices[self.random.randrange(visible)]
+            device.rssi = max(-100, min(-30, device.rssi + self.random.randint(-3, 3)))
+            on_detect(device_record(device, SimulatedAdvertisement(device)))
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def enumerate(self, ble_device, timeout):
+        self.connects += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            if self.random.random() < self.missing_rate:
+                raise DeviceNotFound(ble_device.address)
+
+            delay = self.random.uniform(*self.latency)
+            if self.random.random() < self.failure_rate or delay > timeout:
+                await asyncio.sleep(timeout)
+                raise asyncio.TimeoutError()
+
+            await asyncio.sleep(delay)
+            return {
+                "services": list(ble_device.services),
+                "characteristics": list(self.CHARACTERISTICS)
+            }
+        finally:
+            self.active -= 1
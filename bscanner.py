@@ -3,17 +3,50 @@ import json
 import argparse
 import sqlite3
 from datetime import datetime, timezone
-from bleak import BleakScanner, BleakClient
-from bleak.exc import BleakDeviceNotFoundError
+import random
 import traceback
+from collections import OrderedDict, deque
+
+from report_sink import JsonlSink, read_jsonl
+from cve_index import CveIndex
+from bt_identifiers import fingerprint_identifiers
+from ble_backend import BleakBackend, SimulatedBackend, DeviceNotFound
+from core.result_store import ResultStore, fingerprint as stable_hash
 
 SQLITE_DB_FILE = "bluetooth_cves.db"
 
+# Concurrent connections; most adapters handle only a handful
+CONNECT_SLOTS = 3
+CONNECT_TIMEOUT = 10.0
+# Total time one device may take, retries included
+DEVICE_DEADLINE = 45.0
+RETRIES = 2
+BACKOFF = 1.0
+# GATT layouts of a device with an unchanged advertisement are reused for a day
+FINGERPRINT_TTL = 24 * 3600
+
+# Monitor mode
+RSSI_HISTORY = 100
+REPORT_INTERVAL = 60
+LOST_AFTER = 120
+MAX_TRACKED = 10000
+
 
 class BluetoothDefensiveScanner:
 
-    def __init__(self, timeout=10):
+    def __init__(self, timeout=10, backend=None, connect_slots=CONNECT_SLOTS,
+                 connect_timeout=CONNECT_TIMEOUT, device_deadline=DEVICE_DEADLINE,
+                 retries=RETRIES, backoff=BACKOFF, cache=None, cache_ttl=FINGERPRINT_TTL):
         self.timeout = timeout
+        self.backend = backend or BleakBackend()
+        self.connect_slots = connect_slots
+        self.connect_timeout = connect_timeout
+        self.device_deadline = device_deadline
+        self.retries = retries
+        self.backoff = backoff
+        # ResultStore for GATT fingerprints; None disables caching
+        self.cache = cache
+        self.cache_ttl = cache_ttl
         self.conn = sqlite3.connect(SQLITE_DB_FILE)
         self.conn.row_factory = sqlite3.Row
 
@@ -22,94 +55,192 @@ class BluetoothDefensiveScanner:
     # -------------------------------------------------
     async def discover_devices(self):
         print("[*] Scanning for Bluetooth LE devices...")
-
-        raw_devices = await BleakScanner.discover(
-            timeout=self.timeout,
-            return_adv=True
-        )
-
-        devices = []
-
-        for address, (device, adv) in raw_devices.items():
-            devices.append({
-                "ble_device": device,
-                "name": device.name or "Unknown",
-                "address": device.address,
-                "rssi": adv.rssi
-            })
-
-        return devices
+        return await self.backend.discover(self.timeout)
 
     # -------------------------------------------------
     # Fingerprinting (Windows Safe)
     # -------------------------------------------------
-    async def fingerprint_device(self, ble_device):
+    async def fingerprint_device(self, ble_device, timeout=None):
+        """Single connection attempt; failures are reported in profile["status"]."""
         print(f"[*] Fingerprinting {ble_device.address}")
 
         profile = {
             "services": [],
-            "characteristics": []
+            "characteristics": [],
+            "status": "ok"
         }
 
         try:
-            async with BleakClient(ble_device, timeout=10.0) as client:
-
-                # In Bleak 1.x services are populated automatically
-                services = client.services
-
-                if not services:
-                    print(f"[!] No services discovered for {ble_device.address}")
-                    return profile
-
-                for service in services:
-                    profile["services"].append(str(service.uuid))
-
-                    for char in service.characteristics:
-                        profile["characteristics"].append(str(char.uuid))
+            found = await asyncio.wait_for(
+                self.backend.enumerate(ble_device, timeout or self.connect_timeout),
+                # Connect timeout plus time for service discovery
+                (timeout or self.connect_timeout) * 2
+            )
+            profile.update(found)
+            if not profile["services"]:
+                print(f"[!] No services discovered for {ble_device.address}")
 
-        except BleakDeviceNotFoundError:
+        except DeviceNotFound:
             print(f"[!] Device {ble_device.address} disappeared.")
+            profile["status"] = "not_found"
         except asyncio.TimeoutError:
             print(f"[!] Timeout connecting to {ble_device.address}")
+            profile["status"] = "timeout"
         except Exception as e:
             print(f"[!] Enumeration error {ble_device.address}: {e}")
+            profile["status"] = "error"
 
         return profile
 
-    # -------------------------------------------------
-    # SQLite CVE Matching
-    # -------------------------------------------------
-    def match_cves(self, fingerprint):
-        cur = self.conn.cursor()
-        matched = []
+    async def fingerprint_all(self, devices):
+        """
+        Fingerprints `devices` concurrently and yields (device, profile) as
+        each one finishes, so the caller can match and report while other
+        connections are still running.
 
-        # Basic Bluetooth keyword filter
-        cur.execute("""
-            SELECT id, description, cvss, published
-            FROM cves
-            WHERE description LIKE '%bluetooth%'
-        """)
+        Devices whose advertisement is unchanged since a cached fingerprint
+        (see advertisement_key) are not connected to at all.
 
-        rows = cur.fetchall()
+        At most `connect_slots` connections are open at once (adapters only
+        handle a few). A failed attempt is retried up to `retries` times
+        with exponential backoff, without holding a slot while it waits;
+        from its first attempt, a device gets `device_deadline` seconds in
+        total.
+        """
+        slots = asyncio.Semaphore(self.connect_slots)
+        done = asyncio.Queue()
 
-        for row in rows:
-            description_lower = row["description"].lower()
+        async def run(device):
+            await done.put((device, await self._fingerprint(device, slots)))
 
-            # Try matching service UUID fragments
-            match_found = False
-            for service in fingerprint["services"]:
-                if service[:8].lower() in description_lower:
-                    match_found = True
-                    break
+        tasks = [asyncio.create_task(run(device)) for device in devices]
+        try:
+            for _ in tasks:
+                yield await done.get()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _fingerprint(self, device, slots):
+        profile = self._cached_fingerprint(device)
+        if profile is None:
+            profile = await self._fingerprint_with_retry(device, slots)
+            self._store_fingerprint(device, profile)
+        return profile
 
-            if match_found:
-                matched.append(dict(row))
+    def _cached_fingerprint(self, device):
+        if self.cache is None:
+            return None
+        cached = self.cache.get(device["address"], "bscanner", "gatt",
+                                advertisement_key(device), self.cache_ttl)
+        if cached is None:
+            return None
+        cached["status"] = "cached"
+        return cached
+
+    def _store_fingerprint(self, device, profile):
+        # Failed or empty enumerations are retried next time rather than cached
+        if self.cache is None or profile["status"] != "ok" or not profile["services"]:
+            return
+        self.cache.put(device["address"], "bscanner", "gatt", advertisement_key(device), {
+            "services": profile["services"],
+            "characteristics": profile["characteristics"]
+        })
+
+    async def _fingerprint_with_retry(self, device, slots):
+        loop = asyncio.get_running_loop()
+        deadline = None
+        profile = None
+
+        for attempt in range(self.retries + 1):
+            if deadline is None:
+                await slots.acquire()
+                # The deadline covers this device's own attempts, not its time in the queue
+                deadline = loop.time() + self.device_deadline
             else:
-                # Optional: include generic Bluetooth CVEs
-                matched.append(dict(row))
+                try:
+                    await asyncio.wait_for(slots.acquire(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                remaining = deadline - loop.time()
+                profile = await self.fingerprint_device(
+                    device["ble_device"], timeout=min(self.connect_timeout, max(remaining / 2, 0.1))
+                )
+            finally:
+                slots.release()
+
+            profile["attempts"] = attempt + 1
+            # Only timeouts and transient errors are worth another try
+            if profile["status"] in ("ok", "not_found"):
+                break
+
+            delay = self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+            if loop.time() + delay >= deadline:
+                break
+            await asyncio.sleep(delay)
+
+        return profile
+
+    # -------------------------------------------------
+    # SQLite CVE Matching
+    # -------------------------------------------------
+    def match_cves(self, fingerprint, device=None):
+        index = CveIndex.for_db(self.conn, SQLITE_DB_FILE)
+
+        if index.identifiers:
+            # UUIDs, profiles and vendors -> CVEs (see CveIndex)
+            specific = index.match_identifiers(fingerprint_identifiers(fingerprint, device))
+        else:
+            # No description names a known identifier: look the service UUID
+            # fragments up as tokens
+            specific = dict.fromkeys(
+                index.search(service[:8] for service in fingerprint["services"]), "uuid"
+            )
+
+        return self._matched_rows(index, specific)
 
+    def _matched_rows(self, index, specific):
+        # Only CVEs sharing an identifier with the device; the rest of the
+        # Bluetooth CVEs are counted in generic_cves_count, unscored
+        matched = []
+        for position in index.bluetooth:
+            kind = specific.get(position)
+            if kind is None:
+                continue
+            cve = dict(index.rows[position])
+            cve["match"] = kind
+            matched.append(cve)
         return matched
 
+    def generic_cves_count(self, matched_cves):
+        """Bluetooth CVEs in the database that name nothing the device has."""
+        index = CveIndex.for_db(self.conn, SQLITE_DB_FILE)
+        return len(index.bluetooth) - len(matched_cves)
+
+    def rescore(self, reports):
+        """
+        Re-matches stored report records (e.g. after a CVE database update)
+        against the identifier map in one bulk join. Updates the records in
+        place and returns them.
+        """
+        index = CveIndex.for_db(self.conn, SQLITE_DB_FILE)
+        identifier_sets = [
+            {tuple(identifier.split(":", 1)) for identifier in report.get("identifiers", ())}
+            for report in reports
+        ]
+
+        for report, specific in zip(reports, index.bulk_match(self.conn, identifier_sets)):
+            matched = self._matched_rows(index, specific)
+            report["matched_cves_count"] = len(matched)
+            report["vulnerabilities"] = matched
+            report["generic_cves_count"] = self.generic_cves_count(matched)
+            report["aggregate_risk_score"] = self.risk_score(matched)
+
+        return reports
+
     # -------------------------------------------------
     # Risk Score
     # -------------------------------------------------
@@ -132,8 +263,13 @@ class BluetoothDefensiveScanner:
                 "rssi": device["rssi"]
             },
             "services_detected": fingerprint["services"],
+            "fingerprint_status": fingerprint.get("status", "ok"),
+            "identifiers": sorted(
+                f"{kind}:{value}" for kind, value in fingerprint_identifiers(fingerprint, device)
+            ),
             "matched_cves_count": len(matched_cves),
             "vulnerabilities": matched_cves,
+            "generic_cves_count": self.generic_cves_count(matched_cves),
             "aggregate_risk_score": score,
             "recommendation": (
                 "Patch firmware, enforce LE Secure Connections, "
@@ -141,11 +277,197 @@ class BluetoothDefensiveScanner:
             )
         }
 
+    # -------------------------------------------------
+    # Continuous Monitoring
+    # -------------------------------------------------
+    async def monitor(self, sink, duration=0, history=RSSI_HISTORY, report_interval=REPORT_INTERVAL,
+                      lost_after=LOST_AFTER, max_devices=MAX_TRACKED):
+        """
+        Long-running scan driven by detection callbacks. A device is
+        fingerprinted, matched and written to `sink` as soon as it is first
+        seen (or its advertisement changes), instead of after a full scan
+        window. A change heard while the device is still being fingerprinted
+        is reported once that connection finishes. Records carry an "event"
+        field:
+
+          detected: full device report, with the RSSI samples so far
+          presence: RSSI summary for each device heard in the last
+                    `report_interval` seconds
+          lost:     not heard for `lost_after` seconds; tracking stops
+
+        Each device keeps at most `history` RSSI samples and at most
+        `max_devices` devices are tracked (least recently heard dropped
+        first). Runs for `duration` seconds, or until cancelled if 0.
+        """
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        slots = asyncio.Semaphore(self.connect_slots)
+        tracked = OrderedDict()
+        tasks = set()
+        # Address -> report task in flight; a device is connected to at most
+        # once at a time
+        reporting = {}
+        # Addresses whose advertisement changed while being reported
+        stale = set()
+
+        def start_report(address, state):
+            task = asyncio.create_task(self._report_device(state, state.device, slots, sink))
+            tasks.add(task)
+            reporting[address] = task
+            task.add_done_callback(lambda task: report_done(address, task))
+
+        def report_done(address, task):
+            tasks.discard(task)
+            del reporting[address]
+            if address in stale:
+                stale.discard(address)
+                # Report the latest advertisement, if the device is still tracked
+                state = tracked.get(address)
+                if state is not None and not stop.is_set():
+                    start_report(address, state)
+
+        def on_detect(device):
+            address = device["address"]
+            state = tracked.get(address)
+            if state is None:
+                state = tracked[address] = TrackedDevice(history)
+                if len(tracked) > max_devices:
+                    tracked.popitem(last=False)
+            else:
+                tracked.move_to_end(address)
+
+            state.device = device
+            state.last_seen = loop.time()
+            state.rssi.append((datetime.now(timezone.utc).isoformat(), device["rssi"]))
+            state.heard += 1
+
+            key = advertisement_key(device)
+            if key != state.key:
+                state.key = key
+                if address in reporting:
+                    stale.add(address)
+                else:
+                    start_report(address, state)
+
+        async def housekeeping():
+            next_report = loop.time() + report_interval
+            while not stop.is_set():
+                await asyncio.sleep(1)
+                now = loop.time()
+
+                while tracked:
+                    state = next(iter(tracked.values()))
+                    if now - state.last_seen < lost_after:
+                        break
+                    tracked.popitem(last=False)
+                    sink.write(self._event_record("lost", state))
+
+                if now >= next_report:
+                    for state in tracked.values():
+                        if state.heard:
+                            sink.write(self._event_record("presence", state))
+                            state.heard = 0
+                    next_report = now + report_interval
+
+        print("[*] Monitoring Bluetooth LE advertisements. Ctrl+C to stop.")
+        keeper = asyncio.create_task(housekeeping())
+        scanning = asyncio.create_task(self.backend.monitor(on_detect, stop))
+        try:
+            if duration:
+                await asyncio.wait([scanning], timeout=duration)
+                if scanning.done():
+                    # The backend stopped before the duration was up; raise
+                    # its error instead of losing it in the gather below
+                    scanning.result()
+            else:
+                await scanning
+        finally:
+            stop.set()
+            for task in list(tasks) + [keeper]:
+                task.cancel()
+            await asyncio.gather(scanning, keeper, *tasks, return_exceptions=True)
+
+        return len(tracked)
+
+    async def _report_device(self, state, device, slots, sink):
+        fingerprint = await self._fingerprint(device, slots)
+        matched = self.match_cves(fingerprint, device)
+        report = self.generate_report(device, fingerprint, matched, self.risk_score(matched))
+        report["event"] = "detected"
+        report["rssi_history"] = list(state.rssi)
+        sink.write(report)
+
+    def _event_record(self, event, state):
+        samples = [rssi for _, rssi in state.rssi]
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "event": event,
+            "device": {
+                "name": state.device["name"],
+                "address": state.device["address"],
+                "rssi": state.device["rssi"]
+            },
+            "rssi": {
+                "min": min(samples),
+                "max": max(samples),
+                "mean": round(sum(samples) / len(samples), 1),
+                "samples": len(samples)
+            }
+        }
+
     # -------------------------------------------------
     def close(self):
         self.conn.close()
 
 
+class TrackedDevice:
+    """Monitor-mode state for one address."""
+
+    __slots__ = ("device", "key", "last_seen", "rssi", "heard")
+
+    def __init__(self, history):
+        self.device = None
+        self.key = None
+        self.last_seen = 0.0
+        # (ISO timestamp, RSSI) samples, oldest dropped first
+        self.rssi = deque(maxlen=history)
+        # Advertisements since the last presence record
+        self.heard = 0
+
+
+def advertisement_key(device):
+    """
+    Hash of the advertisement fields that describe what a device is. RSSI
+    and manufacturer payload bytes (which rotate on many phones) are left
+    out so they don't defeat the cache.
+    """
+    return stable_hash(
+        device.get("name"),
+        sorted(device.get("manufacturer_ids", ())),
+        sorted(str(uuid).lower() for uuid in device.get("advertised_services", ()))
+    )
+
+
+def rescore_file(scanner, source, output, pretty=False):
+    """Re-matches every record of a stored report and writes them to `output`."""
+    if source.endswith(".json"):
+        with open(source, "r", encoding="utf-8") as f:
+            reports = json.load(f)
+    else:
+        reports = list(read_jsonl(source))
+
+    scanner.rescore(reports)
+
+    if output.endswith(".json"):
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(reports, f, indent=4)
+    else:
+        with JsonlSink(output, compact=not pretty, flush_every=1000, append=False) as sink:
+            sink.write_many(reports)
+
+    print(f"[+] Re-scored {len(reports)} records from {source}. Report saved to {output}")
+
+
 # =====================================================
 # MAIN
 # =====================================================
@@ -154,29 +476,108 @@ async def main():
         description="Defensive Bluetooth Vulnerability Scanner (SQLite-backed)"
     )
     parser.add_argument("--timeout", type=int, default=10)
-    parser.add_argument("--output", default="report.json")
+    parser.add_argument("--output", default="report.jsonl",
+                        help="JSON Lines report (.gz / .zst suffix to compress); "
+                             "a .json name writes a single JSON array at the end")
+    parser.add_argument("--pretty", action="store_true", help="spaces after separators in JSONL output")
+    parser.add_argument("--rescore", metavar="REPORT",
+                        help="re-match a stored report against the CVE database instead of scanning")
+    parser.add_argument("--slots", type=int, default=CONNECT_SLOTS,
+                        help=f"concurrent device connections (default {CONNECT_SLOTS})")
+    parser.add_argument("--retries", type=int, default=RETRIES,
+                        help=f"connection retries per device (default {RETRIES})")
+    parser.add_argument("--deadline", type=float, default=DEVICE_DEADLINE,
+                        help=f"seconds allowed per device, retries included (default {DEVICE_DEADLINE:g})")
+    parser.add_argument("--cache", default="scan_cache.db",
+                        help="fingerprint cache database (default scan_cache.db)")
+    parser.add_argument("--no-cache", action="store_true", help="always connect to every device")
+    parser.add_argument("--cache-ttl", type=float, default=FINGERPRINT_TTL,
+                        help=f"seconds a cached fingerprint stays valid (default {FINGERPRINT_TTL})")
+    parser.add_argument("--simulate", type=int, metavar="N",
+                        help="use a simulated radio with N devices instead of a real adapter")
+    parser.add_argument("--monitor", action="store_true",
+                        help="keep scanning and append records as devices appear (JSONL output only)")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="stop monitoring after this many seconds (default: until Ctrl+C)")
+    parser.add_argument("--history", type=int, default=RSSI_HISTORY,
+                        help=f"RSSI samples kept per device in monitor mode (default {RSSI_HISTORY})")
+    parser.add_argument("--report-interval", type=float, default=REPORT_INTERVAL,
+                        help=f"seconds between presence records in monitor mode (default {REPORT_INTERVAL})")
     args = parser.parse_args()
 
-    scanner = BluetoothDefensiveScanner(timeout=args.timeout)
+    if args.monitor and args.output.endswith(".json"):
+        parser.error("--monitor writes JSON Lines; use a .jsonl output")
+
+    backend = SimulatedBackend(count=args.simulate) if args.simulate else None
+    cache = None if args.no_cache or args.rescore else ResultStore(args.cache)
+    scanner = BluetoothDefensiveScanner(
+        timeout=args.timeout,
+        backend=backend,
+        connect_slots=args.slots,
+        retries=args.retries,
+        device_deadline=args.deadline,
+        cache=cache,
+        cache_ttl=args.cache_ttl
+    )
+
+    if args.rescore:
+        rescore_file(scanner, args.rescore, args.output, args.pretty)
+        scanner.close()
+        return
+
+    if args.monitor:
+        sink = JsonlSink(args.output, compact=not args.pretty)
+        tracked = None
+        try:
+            tracked = await scanner.monitor(sink, duration=args.duration, history=args.history,
+                                            report_interval=args.report_interval)
+        except asyncio.CancelledError:
+            # Ctrl+C: asyncio.run cancels this task; monitor() has already
+            # stopped the scan, so finish with the summary
+            pass
+        finally:
+            sink.close()
+            scanner.close()
+            if cache is not None:
+                cache.close()
+        in_range = f", {tracked} devices in range" if tracked is not None else ""
+        print(f"[+] Monitoring stopped{in_range}. {sink.count} records appended to {args.output}")
+        return
 
     devices = await scanner.discover_devices()
 
+    legacy_json = args.output.endswith(".json")
     all_reports = []
+    sink = None if legacy_json else JsonlSink(args.output, compact=not args.pretty, append=False)
+
+    try:
+        # Matching and reporting run as each fingerprint completes
+        async for device, fingerprint in scanner.fingerprint_all(devices):
+            matched = scanner.match_cves(fingerprint, device)
+            score = scanner.risk_score(matched)
+            report = scanner.generate_report(device, fingerprint, matched, score)
+            if sink:
+                sink.write(report)
+            else:
+                all_reports.append(report)
+    finally:
+        if sink:
+            sink.close()
 
-    for device in devices:
-        fingerprint = await scanner.fingerprint_device(device["ble_device"])
-        matched = scanner.match_cves(fingerprint)
-        score = scanner.risk_score(matched)
-        report = scanner.generate_report(device, fingerprint, matched, score)
-        all_reports.append(report)
-
-    with open(args.output, "w", encoding="utf-8") as f:
-        json.dump(all_reports, f, indent=4)
+    if legacy_json:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(all_reports, f, indent=4)
 
     scanner.close()
+    if cache is not None:
+        print(f"[+] Fingerprint cache: {cache.hits} reused, {cache.misses} connected")
+        cache.close()
 
     print(f"[+] Scan complete. Report saved to {args.output}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\n[!] Interrupted.")
\ No newline at end of file
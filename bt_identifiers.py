@@ -0,0 +1,191 @@
+# bt_identifiers.py
+import re
+
+BASE_UUID_SUFFIX = "-0000-1000-8000-00805f9b34fb"
+
+# Bluetooth SIG assigned numbers for the services and profiles that show
+# up in CVE text (16-bit UUID -> name used in descriptions)
+SIG_UUIDS = {
+    0x1800: "Generic Access",
+    0x1801: "Generic Attribute",
+    0x1802: "Immediate Alert",
+    0x1803: "Link Loss",
+    0x1804: "Tx Power",
+    0x1805: "Current Time",
+    0x180A: "Device Information",
+    0x180D: "Heart Rate",
+    0x180F: "Battery Service",
+    0x1810: "Blood Pressure",
+    0x1812: "HID over GATT",
+    0x1827: "Mesh Provisioning",
+    0x1828: "Mesh Proxy",
+    0x1105: "OBEX Object Push",
+    0x1106: "OBEX File Transfer",
+    0x110A: "Audio Source",
+    0x110B: "Audio Sink",
+    0x110C: "A/V Remote Control Target",
+    0x110E: "A/V Remote Control",
+    0x1115: "PANU",
+    0x1116: "NAP",
+    0x111E: "Handsfree",
+    0x1124: "Human Interface Device",
+    0x112F: "Phonebook Access",
+    0x1132: "Message Access"
+}
+
+# Profile / protocol keyword -> 16-bit UUIDs whose presence implies it
+PROFILES = {
+    "a2dp": (0x110A, 0x110B, 0x110D),
+    "avrcp": (0x110C, 0x110E, 0x110F),
+    "hfp": (0x111E, 0x111F),
+    "hid": (0x1124, 0x1812),
+    "pan": (0x1115, 0x1116, 0x1117),
+    "bnep": (0x1115, 0x1116, 0x1117),
+    "obex": (0x1105, 0x1106, 0x112F, 0x1132),
+    "pbap": (0x112F, 0x1130),
+    "map": (0x1132, 0x1133, 0x1134),
+    "gatt": (0x1801,),
+    "mesh": (0x1827, 0x1828)
+}
+
+PROFILE_PATTERNS = {
+    "a2dp": r"a2dp|advanced audio distribution",
+    "avrcp": r"avrcp|a/v remote control",
+    "hfp": r"hfp|hands[- ]?free profile",
+    "hid": r"hid|hogp|human interface device",
+    "pan": r"pan profile|personal area network",
+    "bnep": r"bnep",
+    "obex": r"obex",
+    "pbap": r"pbap|phone ?book access",
+    "map": r"message access profile",
+    "gatt": r"gatt|generic attribute",
+    "mesh": r"(?:bluetooth|ble) mesh|mesh provisioning|mesh proxy"
+}
+
+# Vendor keyword -> Bluetooth SIG company identifiers (advertised in
+# manufacturer-specific data)
+VENDORS = {
+    "apple": (0x004C,),
+    "microsoft": (0x0006,),
+    "google": (0x00E0,),
+    "samsung": (0x0075,),
+    "intel": (0x0002,),
+    "broadcom": (0x000F,),
+    "qualcomm": (0x001D, 0x000A),
+    "realtek": (0x005D,),
+    "mediatek": (0x0046,),
+    "cypress": (0x0131,),
+    "infineon": (0x0009,),
+    "espressif": (0x02E5,),
+    "nordic": (0x0059,),
+    "texas instruments": (0x000D,),
+    "silicon labs": (0x02FF,),
+    "nxp": (0x0025,),
+    "stmicroelectronics": (0x0030,),
+    "dialog semiconductor": (0x00D2,),
+    "telink": (0x0211,),
+    "huawei": (0x027D,),
+    "xiaomi": (0x038F,),
+    "sony": (0x012D,),
+    "bose": (0x009E,),
+    "garmin": (0x0087,),
+    "harman": (0x0057,)
+}
+
+_UUID128_RE = re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b")
+# Bare 4-digit hex is mostly model numbers and years, so 16-bit UUIDs are
+# only taken with a 0x prefix or after the word "uuid"
+_UUID16_RE = re.compile(r"\b(?:0x|uuid[\s:=]+(?:0x)?)([0-9a-f]{4})\b")
+_SERVICE_NAME_RE = re.compile(
+    "|".join(rf"(?P<u{uuid:04x}>\b{re.escape(name.lower())}\b)" for uuid, name in SIG_UUIDS.items())
+)
+_PROFILE_RE = {
+    profile: re.compile(rf"\b(?:{pattern})\b") for profile, pattern in PROFILE_PATTERNS.items()
+}
+_VENDOR_RE = re.compile("|".join(rf"\b{re.escape(vendor)}\b" for vendor in VENDORS))
+
+_COMPANY_VENDOR = {company: vendor for vendor, ids in VENDORS.items() for company in ids}
+_UUID_PROFILES = {}
+for _profile, _uuids in PROFILES.items():
+    for _uuid in _uuids:
+        _UUID_PROFILES.setdefault(_uuid, set()).add(_profile)
+
+
+def normalize_uuid(value):
+    """
+    Full lowercase 128-bit form of a UUID given as 128-bit text, a 16/32-bit
+    hex string ("180f", "0x180F") or an int. Returns None if unparseable.
+    """
+    if isinstance(value, int):
+        return f"{value:08x}{BASE_UUID_SUFFIX}"
+
+    text = str(value).strip().lower()
+    if text.startswith("0x"):
+        text = text[2:]
+    if len(text) in (4, 8) and all(c in "0123456789abcdef" for c in text):
+        return f"{int(text, 16):08x}{BASE_UUID_SUFFIX}"
+    if _UUID128_RE.fullmatch(text):
+        return text
+    return None
+
+
+def short_uuid(uuid):
+    """16-bit value of a SIG base UUID, or None."""
+    if uuid.endswith(BASE_UUID_SUFFIX) and uuid.startswith("0000"):
+        return int(uuid[4:8], 16)
+    return None
+
+
+def extract_identifiers(description):
+    """
+    (kind, value) pairs named in a CVE description:
+    ("uuid", full 128-bit UUID), ("profile", key of PROFILES),
+    ("vendor", key of VENDORS).
+    """
+    text = (description or "").lower()
+    found = set()
+
+    for uuid in _UUID128_RE.findall(text):
+        found.add(("uuid", uuid))
+    for short in _UUID16_RE.findall(text):
+        if int(short, 16) in SIG_UUIDS:
+            found.add(("uuid", normalize_uuid(short)))
+    for match in _SERVICE_NAME_RE.finditer(text):
+        found.add(("uuid", normalize_uuid(match.lastgroup[1:])))
+
+    for profile, pattern in _PROFILE_RE.items():
+        if pattern.search(text):
+            found.add(("profile", profile))
+
+    for vendor in _VENDOR_RE.findall(text):
+        found.add(("vendor", vendor))
+
+    return found
+
+
+def fingerprint_identifiers(fingerprint, device=None):
+    """
+    (kind, value) pairs describing a device: its service and characteristic
+    UUIDs, the profiles those UUIDs imply, and the vendors behind the
+    company identifiers in its advertisement (device["manufacturer_ids"]).
+    """
+    found = set()
+    uuids = list(fingerprint.get("services", ())) + list(fingerprint.get("characteristics", ()))
+    if device:
+        uuids += device.get("advertised_services", ())
+
+    for value in uuids:
+        uuid = normalize_uuid(value)
+        if uuid is None:
+            continue
+        found.add(("uuid", uuid))
+        for profile in _UUID_PROFILES.get(short_uuid(uuid), ()):
+            found.add(("profile", profile))
+
+    if device:
+        for company in device.get("manufacturer_ids", ()):
+            vendor = _COMPANY_VENDOR.get(company)
+            if vendor:
+                found.add(("vendor", vendor))
+
+    return found
@@ -0,0 +1,91 @@
+# checkpoint.py
+import hashlib
+import json
+import os
+import time
+
+FLUSH_INTERVAL = 5
+
+
+class ScanCheckpoint:
+    """
+    On-disk progress for a port scan so an interrupted run can resume.
+
+    Every (host, port) probe of a scan plan has an index. Completed work is
+    stored as a low-watermark (every index below it is done) plus the few
+    indexes completed out of order above it, so the state stays tiny no
+    matter how large the sweep is. Open-port results are kept alongside.
+    The file is rewritten atomically at most every `flush_interval` seconds.
+    """
+
+    def __init__(self, path, resume=False, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.resume = resume
+        self.flush_interval = flush_interval
+        self.plan = None
+        self.done_upto = 0
+        self.done = set()
+        self.results = []
+        self._last_flush = 0.0
+        self._dirty = False
+
+    def begin(self, hosts, ports, banners=False):
+        """
+        Binds the checkpoint to a scan plan. With resume=True, progress from
+        an existing state file for the same plan is loaded; a file written
+        for a different plan is ignored and overwritten.
+        """
+        self.plan = plan_key(hosts, ports, banners)
+        self.done_upto = 0
+        self.done = set()
+        self.results = []
+
+        if self.resume and os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                state = json.load(f)
+            if state.get("plan") == self.plan:
+                self.done_upto = state["done_upto"]
+                self.done = set(state["done"])
+                self.results = [tuple(r) for r in state["results"]]
+
+        self._last_flush = time.monotonic()
+
+    def is_done(self, index):
+        return index < self.done_upto or index in self.done
+
+    def mark(self, index, result=None):
+        self.done.add(index)
+        while self.done_upto in self.done:
+            self.done.discard(self.done_upto)
+            self.done_upto += 1
+
+        if result is not None:
+            self.results.append(tuple(result))
+
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self._dirty or self.plan is None:
+            return
+
+        state = {
+            "plan": self.plan,
+            "done_upto": self.done_upto,
+            "done": sorted(self.done),
+            "results": self.results
+        }
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+        self._dirty = False
+        self._last_flush = time.monotonic()
+
+
+def plan_key(hosts, ports, banners=False):
+    data = json.dumps([list(hosts), list(ports), banners], separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+DB_FILE = "scan_cache.db"
+
+
+class ResultStore:
+    """
+    SQLite cache of module findings per target, so a rescan only re-runs
+    modules whose inputs changed.
+
+    Each row is keyed by (target, module, slot) where slot is the phase name
+    ("collect", "scan") or "analyze:<findings key>". A row is reused only
+    while its fingerprint still matches and it is younger than the module's
+    CACHE_TTL.
+    """
+
+    def __init__(self, db_file=DB_FILE):
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.hits = 0
+        self.misses = 0
+        self._init_db()
+
+    def _init_db(self):
+        cur = self.conn.cursor()
+
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS module_results (
+            target TEXT,
+            module TEXT,
+            slot TEXT,
+            fingerprint TEXT,
+            findings TEXT,
+            stored_at REAL,
+            PRIMARY KEY (target, module, slot)
+        )
+        """)
+
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_stored_at ON module_results(stored_at)")
+
+        self.conn.commit()
+
+    def get(self, target, module, slot, fingerprint, ttl):
+        with self._lock:
+            row = self.conn.execute("""
+                SELECT fingerprint, findings, stored_at
+                FROM module_results
+                WHERE target = ? AND module = ? AND slot = ?
+            """, (target, module, slot)).fetchone()
+
+            if row and row[0] == fingerprint and time.time() - row[2] < ttl:
+                self.hits += 1
+                return json.loads(row[1])
+
+            self.misses += 1
+            return None
+
+    def put(self, target, module, slot, fingerprint, findings):
+        with self._lock:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO module_results
+                (target, module, slot, fingerprint, findings, stored_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (target, module, slot, fingerprint, json.dumps(findings, default=str), time.time()))
+            self.conn.commit()
+
+    def purge(self, max_age):
+        """Drops rows older than max_age seconds."""
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM module_results WHERE stored_at < ?",
+                (time.time() - max_age,)
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def fingerprint(*parts):
+    """Stable hash of JSON-serialisable values."""
+    data = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def target_key(context):
+    return context.get("url") or fingerprint(context)
@@ -1,40 +1,327 @@
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from core.result_store import fingerprint, target_key
+from core.stats import EngineStats, profiled
+
+
 class SecurityEngine:
 
-    def __init__(self, modules, risk):
-        self.modules = modules
+    def __init__(self, modules, risk, max_workers=16, module_limits=None, target_timeout=None, stats=None,
+                 store=None, validator=None):
+        """
+        max_workers: size of the worker pool used by run_batch.
+        module_limits: optional {module class name: max concurrent calls} used to
+                       throttle expensive modules (e.g. {"WebAudit": 8}).
+        target_timeout: optional per-target deadline in seconds for run_batch.
+        stats: EngineStats that receives per-module timings (one is created
+               if not given; see `engine.stats`).
+        store: optional ResultStore; modules with a CACHE_TTL reuse stored
+               findings while the target's fingerprint is unchanged.
+        validator: callable(context) -> fingerprint string (or None to skip
+                   caching for that target). Defaults to a hash of the context.
+
+        Modules run in the given order, except that a module listing other
+        module class names in DEPENDS_ON always runs after them.
+        """
+        self.modules = order_modules(modules)
         self.risk = risk
+        self.max_workers = max_workers
+        self.target_timeout = target_timeout
+        self.stats = stats or EngineStats()
+        self.store = store
+        self.validator = validator or fingerprint
+        self._limits = {
+            name: threading.BoundedSemaphore(limit)
+            for name, limit in (module_limits or {}).items()
+        }
 
     def run(self, context=None):
         """
         context: dict with keys like 'url', 'targets', etc.
         """
-        findings = {}
         context = context or {}
+        findings = {}
+        self._run_phases(context, findings)
+        return self._score(findings)
+
+    def run_batch(self, contexts, max_workers=None, target_timeout=None):
+        """
+        Run many contexts concurrently on a bounded worker pool.
+
+        Returns a list of (score, findings) tuples in the same order as
+        `contexts`. A target that exceeds its deadline is reported with the
+        findings collected so far plus an INFO finding noting the timeout;
+        its worker stops at the next module boundary. A module raising on
+        one target likewise ends only that target, with its partial findings
+        plus an INFO finding naming the error.
+        """
+        contexts = [c or {} for c in contexts]
+        max_workers = max_workers or self.max_workers
+        timeout = target_timeout if target_timeout is not None else self.target_timeout
+
+        runs = [_TargetRun(context, timeout) for context in contexts]
+        results = [None] * len(runs)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {executor.submit(self._run_target, run): i for i, run in enumerate(runs)}
+            pending = set(futures)
+
+            while pending:
+                done, pending = wait(pending, timeout=self._poll_interval(runs), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    i = futures[future]
+                    if results[i] is None:
+                        results[i] = future.result()
+
+                now = time.monotonic()
+                for future in list(pending):
+                    i = futures[future]
+                    run = runs[i]
+                    if run.expired(now):
+                        results[i] = self._score(run.partial_findings())
+                        pending.discard(future)
+        finally:
+            # Timed-out workers finish their current module call in the
+            # background; don't hold the batch hostage to them.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return results
+
+    # -------------------------------------------------
+    # Internals
+    # -------------------------------------------------
+    def _run_target(self, run):
+        run.start()
+        try:
+            completed = self._run_phases(run.context, run.findings, run)
+        except Exception as e:
+            return self._score(run.failed_findings(e))
+        if not completed:
+            return self._score(run.partial_findings())
+        return self._score(run.snapshot())
+
+    def _run_phases(self, context, findings, run=None):
+        cache_key = self._cache_key(context)
 
         # Collect phase
         for module in self.modules:
             if hasattr(module, "collect"):
-                data = module.collect(context)
+                if run and run.cancelled():
+                    return False
+                data = self._cached_call(module, module.collect, (context,), cache_key, run)
                 if data:
-                    findings[module.__class__.__name__] = data
+                    self._store(findings, module.__class__.__name__, data, run, replace=True)
 
         # Scan phase
         for module in self.modules:
             if hasattr(module, "scan"):
-                scan_results = module.scan(context)
-                findings.setdefault(module.__class__.__name__, []).extend(scan_results)
+                if run and run.cancelled():
+                    return False
+                scan_results = self._cached_call(module, module.scan, (context,), cache_key, run)
+                self._store(findings, module.__class__.__name__, scan_results, run)
+
+        # Analyze phase: every analyzer reads a frozen snapshot of the
+        # collected/scanned data plus the outputs of the modules it depends
+        # on, never findings appended by unrelated analyzers (or itself).
+        with run.lock if run else nullcontext():
+            collected = {key: tuple(values) for key, values in findings.items()}
+        produced = {}
 
-        # Analyze phase
         for module in self.modules:
             if hasattr(module, "analyze"):
-                for key, value in findings.items():
-                    results = module.analyze(value, context)
-                    findings[key].extend(results)
+                name = module.__class__.__name__
+                outputs = produced.setdefault(name, {})
+                for key, data in collected.items():
+                    if run and run.cancelled():
+                        return False
+                    upstream = [
+                        result
+                        for dep in _dependencies(module)
+                        for result in produced.get(dep, {}).get(key, ())
+                    ]
+                    if upstream:
+                        data = data + tuple(upstream)
+                    results = self._cached_call(
+                        module, module.analyze, (data, context), cache_key, run,
+                        slot=f"analyze:{key}", inputs=data
+                    )
+                    outputs.setdefault(key, []).extend(results)
+                    self._store(findings, key, results, run)
+
+        return True
+
+    def _cache_key(self, context):
+        if self.store is None:
+            return None
+        validator = self.validator(context)
+        if validator is None:
+            return None
+        return target_key(context), validator
+
+    def _cached_call(self, module, method, args, cache_key, run=None, slot=None, inputs=None):
+        ttl = getattr(module, "CACHE_TTL", None)
+        if cache_key is None or not ttl:
+            return self._call(module, method, *args, run=run) or []
 
+        target, validator = cache_key
+        name = module.__class__.__name__
+        slot = slot or method.__name__
+        # Analyzers are keyed on their input data as well as the target
+        key = validator if inputs is None else fingerprint(validator, inputs)
+
+        cached = self.store.get(target, name, slot, key, ttl)
+        if cached is not None:
+            return cached
+
+        results = self._call(module, method, *args, run=run)
+        if results is None:
+            return []
+        self.store.put(target, name, slot, key, results)
+        return results
+
+    def _call(self, module, method, *args, run=None):
+        limit = self._limits.get(module.__class__.__name__)
+        if limit is None:
+            return self._timed(module, method, *args)
+
+        # Don't wait on a busy module past the target's deadline
+        if not limit.acquire(timeout=run.remaining() if run else None):
+            return None
+        try:
+            return self._timed(module, method, *args)
+        finally:
+            limit.release()
+
+    def _timed(self, module, method, *args):
+        name = module.__class__.__name__
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        result = None
+        try:
+            if self.stats.should_profile(name):
+                result, profile = profiled(method, *args)
+                self.stats.add_profile(profile)
+            else:
+                result = method(*args)
+            return result
+        finally:
+            self.stats.record(
+                name,
+                method.__name__,
+                time.perf_counter() - wall,
+                time.thread_time() - cpu,
+                len(result) if result else 0
+            )
+
+    def _store(self, findings, key, values, run=None, replace=False):
+        with run.lock if run else nullcontext():
+            if replace:
+                findings[key] = values
+            else:
+                findings.setdefault(key, []).extend(values)
+
+    def _score(self, findings):
         # Flatten all findings
         all_findings = []
         for k, v in findings.items():
             all_findings.extend(v)
 
         score = self.risk.calculate(all_findings)
-        return score, all_findings
\ No newline at end of file
+        return score, all_findings
+
+    def _poll_interval(self, runs):
+        if not any(run.timeout for run in runs):
+            return None
+        return 0.1
+
+
+def order_modules(modules):
+    """
+    Orders modules so each one comes after the modules named in its
+    DEPENDS_ON list, otherwise keeping the given order. Dependencies on
+    modules that aren't present are ignored.
+    """
+    names = {module.__class__.__name__ for module in modules}
+    remaining = list(modules)
+    ordered = []
+    placed = set()
+
+    while remaining:
+        for i, module in enumerate(remaining):
+            deps = [dep for dep in _dependencies(module) if dep in names]
+            if all(dep in placed for dep in deps):
+                ordered.append(module)
+                placed.add(module.__class__.__name__)
+                del remaining[i]
+                break
+        else:
+            cycle = ", ".join(m.__class__.__name__ for m in remaining)
+            raise ValueError(f"Circular module dependencies between: {cycle}")
+
+    return ordered
+
+
+def _dependencies(module):
+    return getattr(module, "DEPENDS_ON", ())
+
+
+class _TargetRun:
+    """
+    Bookkeeping for one context inside run_batch: the findings collected so
+    far and the deadline the worker has to respect.
+    """
+
+    def __init__(self, context, timeout):
+        self.context = context
+        self.timeout = timeout
+        self.findings = {}
+        self.lock = threading.Lock()
+        self.deadline = None
+        self.timed_out = False
+
+    def start(self):
+        if self.timeout:
+            self.deadline = time.monotonic() + self.timeout
+
+    def cancelled(self):
+        return self.timed_out or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def remaining(self):
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def expired(self, now):
+        if self.deadline is None or now < self.deadline:
+            return False
+        self.timed_out = True
+        return True
+
+    def snapshot(self):
+        with self.lock:
+            return {k: list(v) for k, v in self.findings.items()}
+
+    def partial_findings(self):
+        findings = self.snapshot()
+        findings.setdefault("SecurityEngine", []).append({
+            "device": self.context.get("url", "N/A"),
+            "severity": "INFO",
+            "issue": "Scan deadline exceeded",
+            "details": f"Target did not finish within {self.timeout}s; results are partial"
+        })
+        return findings
+
+    def failed_findings(self, error):
+        findings = self.snapshot()
+        findings.setdefault("SecurityEngine", []).append({
+            "device": self.context.get("url", "N/A"),
+            "severity": "INFO",
+            "issue": "Scan failed",
+            "details": f"{type(error).__name__}: {error}; results are partial"
+        })
+        return findings
@@ -0,0 +1,113 @@
+import cProfile
+import io
+import pstats
+import threading
+
+
+class EngineStats:
+    """
+    Per-module, per-phase counters collected by SecurityEngine: number of
+    calls, wall time, CPU time (of the calling thread) and findings returned.
+
+    profile_module: optional module class name whose calls are run under
+                    cProfile; the merged profile is available from
+                    profile_report().
+    """
+
+    PHASES = ["collect", "scan", "analyze"]
+
+    def __init__(self, profile_module=None):
+        self.profile_module = profile_module
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._profile = None
+
+    def record(self, module_name, phase, wall, cpu, findings):
+        with self._lock:
+            entry = self._entries.setdefault((module_name, phase), {
+                "calls": 0,
+                "wall": 0.0,
+                "cpu": 0.0,
+                "findings": 0
+            })
+            entry["calls"] += 1
+            entry["wall"] += wall
+            entry["cpu"] += cpu
+            entry["findings"] += findings
+
+    def should_profile(self, module_name):
+        return self.profile_module is not None and module_name == self.profile_module
+
+    def add_profile(self, profile):
+        # cProfile only sees the thread it was enabled on, so every call gets
+        # its own profiler and the results are merged here.
+        with self._lock:
+            if self._profile is None:
+                self._profile = pstats.Stats(profile)
+            else:
+                self._profile.add(profile)
+
+    def as_dict(self):
+        """{module: {phase: {"calls", "wall", "cpu", "findings"}}}"""
+        with self._lock:
+            result = {}
+            for (module_name, phase), entry in self._entries.items():
+                result.setdefault(module_name, {})[phase] = dict(entry)
+            return result
+
+    def totals(self):
+        """{module: totals across phases}, slowest module first."""
+        totals = {}
+        for module_name, phases in self.as_dict().items():
+            total = {"calls": 0, "wall": 0.0, "cpu": 0.0, "findings": 0}
+            for entry in phases.values():
+                for key in total:
+                    total[key] += entry[key]
+            totals[module_name] = total
+        return dict(sorted(totals.items(), key=lambda item: item[1]["wall"], reverse=True))
+
+    def summary(self):
+        lines = [f"{'MODULE':<20} {'PHASE':<8} {'CALLS':>6} {'WALL(s)':>9} {'CPU(s)':>9} {'FINDINGS':>9}"]
+        stats = self.as_dict()
+        for module_name in self.totals():
+            for phase in self.PHASES:
+                entry = stats[module_name].get(phase)
+                if not entry:
+                    continue
+                lines.append(
+                    f"{module_name:<20} {phase:<8} {entry['calls']:>6} "
+                    f"{entry['wall']:>9.3f} {entry['cpu']:>9.3f} {entry['findings']:>9}"
+                )
+        return "\n".join(lines)
+
+    def profile_report(self, sort="cumulative", limit=25):
+        with self._lock:
+            if self._profile is None:
+                return ""
+            out = io.StringIO()
+            self._profile.stream = out
+            self._profile.sort_stats(sort).print_stats(limit)
+            return out.getvalue()
+
+    def reset(self):
+        with self._lock:
+            self._entries = {}
+            self._profile = None
+
+
+# Python 3.12+ allows one active profiler per process (enable() raises
+# "Another profiling tool is already active"), so profiled calls run one
+# at a time.
+_profile_lock = threading.Lock()
+
+
+def profiled(method, *args):
+    """Runs method(*args) under a fresh cProfile.Profile; returns (result, profile)."""
+    with _profile_lock:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            result = method(*args)
+        finally:
+            profile.disable()
+    return result, profile
@@ -0,0 +1,157 @@
+# cve_index.py
+import re
+import threading
+
+from bt_identifiers import extract_identifiers
+
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+SPECIFICITY = {"uuid": 0, "vendor": 1, "profile": 2}
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class CveIndex:
+    """
+    In-memory view of the cves table, built with a single pass over the
+    rows: the Bluetooth CVEs in table order, plus an inverted index from
+    description token to CVE. Looking a term up is a dict access instead of
+    a LIKE scan over every description.
+
+    Tokens are runs of lowercase letters and digits, so "0000180f" in
+    "uuid 0000180f-0000-1000-8000-00805f9b34fb" or "0x180F" can be found;
+    a leading "0x" on hex values is indexed without the prefix as well.
+
+    identifiers maps (kind, value) to the CVEs naming it. It is loaded from
+    the cve_identifiers table when loadcve.py has built it, and otherwise
+    derived from the descriptions the same way.
+    """
+
+    def __init__(self, conn):
+        self.rows = []
+        self.bluetooth = []
+        self.tokens = {}
+        self.identifiers = {}
+        positions = {}
+
+        cur = conn.execute("SELECT id, description, cvss, published FROM cves ORDER BY rowid")
+        for position, (cve_id, description, cvss, published) in enumerate(cur):
+            description = description or ""
+            self.rows.append({
+                "id": cve_id,
+                "description": description,
+                "cvss": cvss,
+                "published": published
+            })
+
+            text = description.lower()
+            # Same rows as: WHERE description LIKE '%bluetooth%'
+            if "bluetooth" in text:
+                self.bluetooth.append(position)
+
+            for token in set(_tokens(text)):
+                self.tokens.setdefault(token, []).append(position)
+            positions[cve_id] = position
+
+        if has_identifier_map(conn):
+            for kind, value, cve_id in conn.execute("SELECT kind, value, cve_id FROM cve_identifiers"):
+                if cve_id in positions:
+                    self.identifiers.setdefault((kind, value), set()).add(positions[cve_id])
+        else:
+            # Database not mapped by loadcve.py yet (e.g. the bundled one)
+            for position, row in enumerate(self.rows):
+                for identifier in extract_identifiers(row["description"]):
+                    self.identifiers.setdefault(identifier, set()).add(position)
+        self._positions = positions
+
+    @classmethod
+    def for_db(cls, conn, key):
+        """One index per database per process; `key` is usually the DB path."""
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = _indexes[key] = cls(conn)
+            return index
+
+    def search(self, terms):
+        """Positions of the CVEs whose description contains any of `terms` as a token."""
+        found = set()
+        for term in terms:
+            for token in _tokens(term.lower()):
+                found.update(self.tokens.get(token, ()))
+        return found
+
+    def match_identifiers(self, identifiers):
+        """
+        {position: kind} for the CVEs sharing an identifier with the
+        (kind, value) pairs given; a CVE matched several ways keeps the
+        most specific kind (uuid, then vendor, then profile).
+        """
+        found = {}
+        for identifier in sorted(identifiers, key=_specificity):
+            for position in self.identifiers.get(identifier, ()):
+                found.setdefault(position, identifier[0])
+        return found
+
+    def bulk_match(self, conn, identifier_sets):
+        """
+        match_identifiers for many fingerprints at once, as a single join of
+        the fingerprints against cve_identifiers inside SQLite. Returns one
+        {position: kind} dict per entry of identifier_sets.
+        """
+        if not has_identifier_map(conn):
+            # Map derived in memory: nothing to join against
+            return [self.match_identifiers(identifiers) for identifiers in identifier_sets]
+
+        results = [{} for _ in identifier_sets]
+
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS fingerprint_identifiers "
+                     "(fingerprint INTEGER, kind TEXT, value TEXT)")
+        conn.execute("DELETE FROM fingerprint_identifiers")
+        conn.executemany(
+            "INSERT INTO fingerprint_identifiers VALUES (?, ?, ?)",
+            ((n, kind, value) for n, identifiers in enumerate(identifier_sets)
+             for kind, value in identifiers)
+        )
+
+        cur = conn.execute("""
+            SELECT f.fingerprint, f.kind, c.cve_id
+            FROM fingerprint_identifiers f
+            JOIN cve_identifiers c ON c.kind = f.kind AND c.value = f.value
+        """)
+        for n, kind, cve_id in sorted(cur, key=lambda row: (row[0], _specificity((row[1],)))):
+            position = self._positions.get(cve_id)
+            if position is not None:
+                results[n].setdefault(position, kind)
+
+        conn.execute("DELETE FROM fingerprint_identifiers")
+        return results
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def has_identifier_map(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cve_identifiers'"
+    ).fetchone() is not None
+
+
+def invalidate(key=None):
+    """Drops cached indexes (e.g. after loadcve.py refreshed the database)."""
+    with _indexes_lock:
+        if key is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(key, None)
+
+
+def _specificity(identifier):
+    return SPECIFICITY.get(identifier[0], len(SPECIFICITY))
+
+
+def _tokens(text):
+    for token in TOKEN_RE.findall(text):
+        yield token
+        if token.startswith("0x") and len(token) > 2:
+            yield token[2:]
@@ -2,16 +2,30 @@ import json
 import os
 from datetime import datetime
 
-REPORT_FILE = "report.json"
+from report_sink import read_jsonl
+
+REPORT_FILE = "report.jsonl"
 DASHBOARD_FILE = "dashboard.html"
 
+def latest_reports(records):
+    # Monitor mode appends presence / lost events and re-reports devices whose
+    # advertisement changed; the dashboard shows the latest full report per device
+    latest = {}
+    for record in records:
+        if record.get("event", "detected") == "detected":
+            latest[record["device"]["address"]] = record
+    return list(latest.values())
+
 def generate_dashboard():
     if not os.path.exists(REPORT_FILE):
         print(f"Error: {REPORT_FILE} not found. Run the scanner first.")
         return
 
-    with open(REPORT_FILE, "r") as f:
-        reports = json.load(f)
+    if REPORT_FILE.endswith(".json"):
+        with open(REPORT_FILE, "r") as f:
+            reports = json.load(f)
+    else:
+        reports = latest_reports(read_jsonl(REPORT_FILE))
 
     # Calculate statistics
     total_devices = len(reports)
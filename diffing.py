@@ -0,0 +1,205 @@
+# diffing.py
+import json
+import os
+from datetime import datetime
+
+from portset import PortSet
+
+HISTORY_FILE = "scan_history.json"
+
+# INFO findings SecurityEngine.run_batch adds to a target it did not finish
+INCOMPLETE_ISSUES = ("Scan deadline exceeded", "Scan failed")
+
+
+def diff_ports(previous, current):
+    """
+    previous / current: {host: PortSet or iterable of ports}
+    Returns a list of {"kind": "port", "change": "opened" | "closed",
+    "host", "port"} records. Hosts whose port sets are unchanged cost a
+    single bitmap comparison.
+    """
+    deltas = []
+
+    for host in sorted(previous.keys() | current.keys()):
+        before = _portset(previous.get(host))
+        after = _portset(current.get(host))
+        if before == after:
+            continue
+
+        for port in after - before:
+            deltas.append({"kind": "port", "change": "opened", "host": host, "port": port})
+        for port in before - after:
+            deltas.append({"kind": "port", "change": "closed", "host": host, "port": port})
+
+    return deltas
+
+
+def diff_findings(previous, current):
+    """
+    previous / current: {target: {"score": ..., "findings": [...]}} as
+    returned by main.run_security_scan (a bare findings list per target is
+    accepted too).
+
+    Findings are grouped on (device, issue). A group holding one finding on
+    each side is reported as "changed" if its severity or details differ.
+    Modules may report the same issue several times (InjectionAudit, once
+    per matched pattern); such groups are compared finding by finding, so
+    an extra match is "new" and a vanished one "resolved".
+    """
+    deltas = []
+
+    for target in sorted(previous.keys() | current.keys()):
+        before_score, before = _normalize(previous.get(target))
+        after_score, after = _normalize(current.get(target))
+
+        if before_score != after_score and before_score is not None and after_score is not None:
+            deltas.append({
+                "kind": "score",
+                "change": "changed",
+                "target": target,
+                "previous": before_score,
+                "current": after_score
+            })
+
+        before_index = _index(before)
+        after_index = _index(after)
+
+        for key in sorted(before_index.keys() | after_index.keys()):
+            old_group = before_index.get(key, [])
+            new_group = after_index.get(key, [])
+
+            if len(old_group) == 1 and len(new_group) == 1:
+                if _identity(old_group[0]) != _identity(new_group[0]):
+                    deltas.append({
+                        "kind": "finding",
+                        "change": "changed",
+                        "target": target,
+                        "finding": new_group[0],
+                        "previous": old_group[0]
+                    })
+                continue
+
+            added, removed = _unmatched(old_group, new_group)
+            for finding in added:
+                deltas.append({"kind": "finding", "change": "new", "target": target, "finding": finding})
+            for finding in removed:
+                deltas.append({"kind": "finding", "change": "resolved", "target": target, "finding": finding})
+
+    return deltas
+
+
+class ScanHistory:
+    """
+    Keeps the last scan on disk and reports what changed since then.
+
+    Port results and SecurityEngine results are stored in separate sections,
+    so the port scanner and main.py can each update their own.
+    """
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {"ports": {}, "results": {}}
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def compare_and_save(self, ports=None, results=None):
+        """
+        ports: {host: PortSet or iterable} from the current scan, with an
+               empty entry for scanned hosts that had no open port
+        results: {target: {"score", "findings"}} from the current scan
+        Returns the deltas against the stored scan and stores this one.
+
+        Hosts and targets missing from this scan keep their stored entry. A
+        target whose scan did not finish is not compared or stored either;
+        it gets a single "incomplete" delta instead, so partial findings
+        don't show up as resolved (and as new again on the next run).
+        """
+        previous = self.load()
+        deltas = []
+
+        if ports is not None:
+            # Only the hosts in `ports` were scanned; the others keep their
+            # stored ports rather than showing up as closed
+            stored = previous.get("ports", {})
+            deltas += diff_ports({host: stored.get(host) for host in ports}, ports)
+            stored.update({host: _portset(found).to_list() for host, found in ports.items()})
+            previous["ports"] = stored
+
+        if results is not None:
+            stored = previous.get("results", {})
+            complete = {}
+            for target, entry in results.items():
+                marker = _incomplete(entry)
+                if marker is None:
+                    complete[target] = entry
+                else:
+                    deltas.append({"kind": "target", "change": "incomplete", "target": target, "finding": marker})
+            deltas += diff_findings({target: stored.get(target) for target in complete}, complete)
+            stored.update(complete)
+            previous["results"] = stored
+
+        previous["time"] = str(datetime.now())
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(previous, f, separators=(",", ":"), default=str)
+        os.replace(tmp_path, self.path)
+
+        return deltas
+
+
+def _portset(ports):
+    if isinstance(ports, PortSet):
+        return ports
+    return PortSet(ports or ())
+
+
+def _normalize(entry):
+    if entry is None:
+        return None, []
+    if isinstance(entry, dict):
+        return entry.get("score"), entry.get("findings", [])
+    return None, entry
+
+
+def _incomplete(entry):
+    """The finding marking an unfinished target scan, or None."""
+    _, findings = _normalize(entry)
+    for finding in findings:
+        if finding.get("severity") == "INFO" and finding.get("issue") in INCOMPLETE_ISSUES:
+            return finding
+    return None
+
+
+def _index(findings):
+    index = {}
+    for finding in findings:
+        key = (str(finding.get("device", "")), str(finding.get("issue", "")))
+        index.setdefault(key, []).append(finding)
+    return index
+
+
+def _identity(finding):
+    # Stored findings come back from JSON, so compare the serialized form
+    return json.dumps(finding, sort_keys=True, default=str)
+
+
+def _unmatched(before, after):
+    """(findings only in after, findings only in before), duplicates counted."""
+    remaining = {}
+    for finding in before:
+        remaining.setdefault(_identity(finding), []).append(finding)
+
+    added = []
+    for finding in after:
+        matches = remaining.get(_identity(finding))
+        if matches:
+            matches.pop()
+        else:
+            added.append(finding)
+
+    removed = [finding for matches in remaining.values() for finding in matches]
+    return added, removed
@@ -1,13 +1,19 @@
-import socket
-import concurrent.futures
+import asyncio
 import re
 import platform
+import argparse
 from datetime import datetime
 
+from checkpoint import ScanCheckpoint
+from diffing import ScanHistory
+from scanner import scan_hosts_async, expand_targets, parse_ports, clamp_concurrency
+
 TARGET = "127.0.0.1"   # CHANGE ONLY IN LAB
 PORT_RANGE = range(1, 1025)
-TIMEOUT = 1
-MAX_THREADS = 100
+# Global in-flight connect budget. Up to BANNER_CONCURRENCY (500) banner
+# sockets stay open on top of it, so 400 fits the usual 1024 fd limit.
+MAX_CONNECTS = 400
+HOST_RATE = 500       # max connects per second to any one host
 
 open_ports = []
 
@@ -36,53 +42,90 @@ def extract_version(banner):
     match = re.search(r"\d+\.\d+(\.\d+)?", banner)
     return match.group(0) if match else "Unknown"
 
-def scan_port(port):
-    try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(TIMEOUT)
-            result = s.connect_ex((TARGET, port))
-            if result == 0:
-                banner = ""
-                try:
-                    s.sendall(b"\r\n")
-                    banner = s.recv(1024).decode(errors="ignore").strip()
-                except:
-                    banner = ""
-
-                service = identify_service(port)
-                version = extract_version(banner)
-
-                open_ports.append({
-                    "port": port,
-                    "service": service,
-                    "version": version,
-                    "banner": banner if banner else "No banner"
-                })
-    except:
-        pass
-
-def run_scan():
+def record_port(host, port, banner):
+    service = identify_service(port)
+    version = extract_version(banner)
+
+    open_ports.append({
+        "host": host,
+        "port": port,
+        "service": service,
+        "version": version,
+        "banner": banner if banner else "No banner"
+    })
+    print(f"[+] {host}:{port} open | {service} | Version: {version}")
+
+def display_port_changes(deltas):
+    print("\n[+] Changes since last scan")
+    if not deltas:
+        print("No changes.")
+    for delta in deltas:
+        print(f"[{delta['change'].upper()}] {delta['host']} Port {delta['port']}")
+
+async def discover(targets, ports, checkpoint=None):
+    """Scans and returns the hosts covered, open ports or not."""
+    hosts = list(dict.fromkeys([host async for host in expand_targets(targets)]))
+
+    # Banners are read over the discovery connection as ports turn up open
+    async for host, port, banner in scan_hosts_async(
+        hosts,
+        ports,
+        concurrency=clamp_concurrency(MAX_CONNECTS, banners=True),
+        host_rate=HOST_RATE,
+        banners=True,
+        checkpoint=checkpoint
+    ):
+        record_port(host, port, banner)
+
+    return hosts
+
+def run_scan(targets=TARGET, ports=PORT_RANGE, state_file=None, resume=False):
+    """
+    targets: IP, hostname or CIDR range (or a list of them)
+    ports: iterable of ports
+    state_file: checkpoint file to save progress to; with resume=True,
+                probes already finished in it are skipped
+    """
     print("=" * 60)
-    print(f"[+] Target: {TARGET}")
+    print(f"[+] Target: {targets}")
     print(f"[+] Time: {datetime.now()}")
     print(f"[+] Host Platform: {platform.system()} {platform.release()}")
     print("=" * 60)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-        executor.map(scan_port, PORT_RANGE)
+    checkpoint = ScanCheckpoint(state_file, resume=resume) if state_file else None
+    try:
+        hosts = asyncio.run(discover(targets, ports, checkpoint))
+    except KeyboardInterrupt:
+        print(f"\n[!] Interrupted. Resume with --state {state_file} --resume" if state_file
+              else "\n[!] Interrupted.")
+        return
 
     print("\n[+] Scan Complete\n")
 
     if open_ports:
-        for entry in sorted(open_ports, key=lambda x: x["port"]):
-            print(f"[OPEN] Port {entry['port']} | "
+        for entry in sorted(open_ports, key=lambda x: (x["host"], x["port"])):
+            print(f"[OPEN] {entry['host']} Port {entry['port']} | "
                   f"{entry['service']} | "
                   f"Version: {entry['version']}")
     else:
         print("No open ports detected.")
 
     print("\n[+] Summary")
+    print(f"Hosts with open ports: {len({entry['host'] for entry in open_ports})}")
     print(f"Total Open Ports: {len(open_ports)}")
 
+    found = {host: [] for host in hosts}
+    for entry in open_ports:
+        found.setdefault(entry["host"], []).append(entry["port"])
+    display_port_changes(ScanHistory().compare_and_save(ports=found))
+
 if __name__ == "__main__":
-    run_scan()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Lab port and service scanner")
+    parser.add_argument("targets", nargs="*", default=[TARGET],
+                        help="IPs, hostnames or CIDR ranges (default: %(default)s)")
+    parser.add_argument("--ports", default="1-1024", help="e.g. 22,80,8000-8100")
+    parser.add_argument("--state", help="checkpoint file for saving progress")
+    parser.add_argument("--resume", action="store_true", help="skip work finished in --state")
+    args = parser.parse_args()
+
+    run_scan(args.targets, parse_ports(args.ports), state_file=args.state, resume=args.resume)
@@ -0,0 +1,185 @@
+# flows.py
+from collections import OrderedDict
+from datetime import datetime
+
+from packet_decode import TCP_FLAG_LETTERS
+
+IDLE_TIMEOUT = 60
+ACTIVE_TIMEOUT = 300
+MAX_FLOWS = 100000
+
+# A source reaching this many distinct (host, port) pairs within
+# SCAN_WINDOW seconds is treated as scanning
+SCAN_THRESHOLD = 100
+SCAN_WINDOW = 60
+
+# A flow of at least FLOOD_MIN_PACKETS averaging FLOOD_PPS is a flood
+FLOOD_MIN_PACKETS = 1000
+FLOOD_PPS = 500
+
+INFO_FIELDS = ("protocol_name", "type", "code")
+
+
+class Flow:
+    __slots__ = ("key", "first_seen", "last_seen", "packets", "bytes",
+                 "max_length", "flags", "info")
+
+    def __init__(self, key, now, packet_info):
+        self.key = key
+        self.first_seen = now
+        self.last_seen = now
+        self.packets = 0
+        self.bytes = 0
+        self.max_length = 0
+        self.flags = set()
+        # Fields of the first packet that are not part of the key
+        self.info = {field: packet_info[field] for field in INFO_FIELDS if field in packet_info}
+
+
+class FlowTable:
+    """
+    Aggregates packet_info dicts into unidirectional flows keyed by
+    (src_ip, dst_ip, protocol, src_port, dst_port) and hands one record per
+    flow to `on_flow` when it ends.
+
+    A flow ends when no packet was seen for `idle_timeout` seconds, when it
+    has been open for `active_timeout` seconds (long flows are reported in
+    slices), when the table is full, or on flush(). Times are packet capture
+    times, so offline and live analysis behave the same.
+
+    classify: per-packet rule function (packet.classify_risk) applied to
+              the flow's destination port and largest packet
+    """
+
+    def __init__(self, on_flow, classify=None, idle_timeout=IDLE_TIMEOUT,
+                 active_timeout=ACTIVE_TIMEOUT, max_flows=MAX_FLOWS,
+                 scan_threshold=SCAN_THRESHOLD, scan_window=SCAN_WINDOW):
+        self.on_flow = on_flow
+        self.classify = classify
+        self.idle_timeout = idle_timeout
+        self.active_timeout = active_timeout
+        self.max_flows = max_flows
+        self.scan_threshold = scan_threshold
+        self.scan_window = scan_window
+
+        # Least recently seen flow first, so idle flows are found at the front
+        self.flows = OrderedDict()
+        self.emitted = 0
+        self._targets = {}
+        # Scanning source -> last time it sent a packet
+        self._scanners = {}
+        self._window_start = None
+
+    def add(self, packet_info, now):
+        key = (packet_info["src_ip"], packet_info["dst_ip"], packet_info["protocol"],
+               packet_info.get("src_port"), packet_info.get("dst_port"))
+
+        self._expire(now)
+        self._track_targets(key, now)
+
+        flow = self.flows.get(key)
+        if flow is not None and now - flow.first_seen >= self.active_timeout:
+            del self.flows[key]
+            self._emit(flow)
+            flow = None
+
+        if flow is None:
+            if len(self.flows) >= self.max_flows:
+                self._emit(self.flows.popitem(last=False)[1])
+            flow = Flow(key, now, packet_info)
+            self.flows[key] = flow
+        else:
+            self.flows.move_to_end(key)
+
+        length = packet_info.get("length", 0)
+        flow.packets += 1
+        flow.bytes += length
+        flow.last_seen = now
+        if length > flow.max_length:
+            flow.max_length = length
+        flags = packet_info.get("flags")
+        if flags:
+            flow.flags.update(flags)
+
+    def flush(self):
+        """Ends every open flow (end of capture)."""
+        while self.flows:
+            self._emit(self.flows.popitem(last=False)[1])
+
+    def __len__(self):
+        return len(self.flows)
+
+    # -------------------------------------------------
+    # Internals
+    # -------------------------------------------------
+    def _expire(self, now):
+        while self.flows:
+            flow = next(iter(self.flows.values()))
+            if now - flow.last_seen < self.idle_timeout:
+                break
+            self.flows.popitem(last=False)
+            self._emit(flow)
+
+    def _track_targets(self, key, now):
+        if self._window_start is None or now - self._window_start >= self.scan_window:
+            self._window_start = now
+            self._targets = {}
+            # Keep a verdict until the scanner's flows have had time to idle out
+            horizon = now - self.idle_timeout - self.scan_window
+            self._scanners = {src: seen for src, seen in self._scanners.items() if seen >= horizon}
+
+        src = key[0]
+        if src in self._scanners:
+            self._scanners[src] = now
+            return
+        targets = self._targets.setdefault(src, set())
+        targets.add((key[1], key[4]))
+        if len(targets) >= self.scan_threshold:
+            self._scanners[src] = now
+            # Only the verdict is needed from here on
+            del self._targets[src]
+
+    def _emit(self, flow):
+        self.emitted += 1
+        self.on_flow(self._record(flow))
+
+    def _record(self, flow):
+        src_ip, dst_ip, protocol, src_port, dst_port = flow.key
+        duration = flow.last_seen - flow.first_seen
+
+        record = {
+            "first_seen": str(datetime.fromtimestamp(flow.first_seen)),
+            "last_seen": str(datetime.fromtimestamp(flow.last_seen)),
+            "duration": round(duration, 3),
+            "src_ip": src_ip,
+            "dst_ip": dst_ip,
+            "protocol": protocol
+        }
+        record.update(flow.info)
+        if src_port is not None:
+            record["src_port"] = src_port
+            record["dst_port"] = dst_port
+        if flow.flags:
+            record["flags"] = "".join(sorted(flow.flags, key=TCP_FLAG_LETTERS.find))
+
+        record.update({
+            "packets": flow.packets,
+            "bytes": flow.bytes,
+            "max_length": flow.max_length
+        })
+
+        indicators = []
+        if src_ip in self._scanners:
+            indicators.append("port_scan")
+        if flow.packets >= FLOOD_MIN_PACKETS and flow.packets / max(duration, 1) >= FLOOD_PPS:
+            indicators.append("flood")
+
+        risk = "LOW"
+        if self.classify is not None:
+            risk = self.classify({"dst_port": dst_port, "length": flow.max_length})
+        if indicators:
+            risk = "HIGH"
+
+        record["indicators"] = indicators
+        record["risk_level"] = risk
+        return record
@@ -1,8 +1,11 @@
+import argparse
 import requests
 import sqlite3
 import time
 from datetime import datetime
 
+from bt_identifiers import extract_identifiers
+
 BASE_URL = "https://services.nvd.nist.gov/rest/json/cves/2.0"
 DB_FILE = "bluetooth_cves.db"
 
@@ -67,6 +70,37 @@ def save_to_db(conn, vulnerabilities):
     conn.commit()
 
 
+def build_identifier_map(conn):
+    """
+    Rebuilds cve_identifiers: one (kind, value, cve_id) row per Bluetooth
+    service UUID, profile or vendor named in a CVE description, so a device
+    fingerprint can be matched with a join instead of text search.
+    """
+    cur = conn.cursor()
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS cve_identifiers (
+        kind TEXT NOT NULL,
+        value TEXT NOT NULL,
+        cve_id TEXT NOT NULL,
+        PRIMARY KEY (kind, value, cve_id)
+    ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_identifiers_cve ON cve_identifiers(cve_id)")
+    cur.execute("DELETE FROM cve_identifiers")
+
+    rows = []
+    for cve_id, description in conn.execute("SELECT id, description FROM cves"):
+        for kind, value in extract_identifiers(description):
+            rows.append((kind, value, cve_id))
+
+    cur.executemany("INSERT OR IGNORE INTO cve_identifiers (kind, value, cve_id) VALUES (?, ?, ?)", rows)
+    conn.commit()
+
+    print(f"[+] Mapped {len(rows)} identifiers to CVEs.")
+    return len(rows)
+
+
 def fetch_bluetooth_cves():
     start_index = 0
     conn = init_db()
@@ -106,9 +140,20 @@ def fetch_bluetooth_cves():
 
         time.sleep(RATE_DELAY)
 
+    build_identifier_map(conn)
     conn.close()
     print("[✓] Bluetooth CVEs stored in SQLite successfully.")
 
 
 if __name__ == "__main__":
-    fetch_bluetooth_cves()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch Bluetooth CVEs from NVD into SQLite")
+    parser.add_argument("--map-only", action="store_true",
+                        help="only rebuild the identifier mapping from the stored CVEs")
+    args = parser.parse_args()
+
+    if args.map_only:
+        conn = init_db()
+        build_identifier_map(conn)
+        conn.close()
+    else:
+        fetch_bluetooth_cves()
\ No newline at end of file
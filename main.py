@@ -1,4 +1,7 @@
 from core.security_engine import SecurityEngine
+from core.result_store import ResultStore
+from core.stats import EngineStats
+from diffing import ScanHistory
 from modules.device_inventory import DeviceInventory
 from modules.config_audit import ConfigAudit
 from modules.encryption_check import EncryptionCheck
@@ -19,15 +22,31 @@ def create_modules():
         EncryptionCheck()
     ]
 
-def run_security_scan(urls):
+# Caps on simultaneous calls into the network-bound modules so a large batch
+# doesn't open hundreds of connections at once.
+MODULE_LIMITS = {
+    "WebAudit": 16,
+    "WifiAudit": 1
+}
+
+def run_security_scan(urls, max_workers=16, target_timeout=120, stats=None, store=None):
     modules = create_modules()
+    web_audit = next(m for m in modules if isinstance(m, WebAudit))
     risk_calculator = RiskScore()
-    engine = SecurityEngine(modules=modules, risk=risk_calculator)
+    engine = SecurityEngine(
+        modules=modules,
+        risk=risk_calculator,
+        max_workers=max_workers,
+        module_limits=MODULE_LIMITS,
+        target_timeout=target_timeout,
+        stats=stats,
+        store=store,
+        validator=web_audit.fingerprint
+    )
 
+    contexts = [{"url": url} for url in urls]  # pass URL to each module
     results = {}
-    for url in urls:
-        context = {"url": url}  # pass URL to each module
-        score, findings = engine.run(context=context)
+    for url, (score, findings) in zip(urls, engine.run_batch(contexts)):
         results[url] = {"score": score, "findings": findings}
     return results
 
@@ -38,6 +57,27 @@ def display_results(results):
         for f in data["findings"]:
             print(f)
 
+def display_deltas(deltas):
+    print("\n--- Changes since last scan ---")
+    if not deltas:
+        print("No changes.")
+    for delta in deltas:
+        if delta["kind"] == "score":
+            print(f"[SCORE] {delta['target']}: {delta['previous']} -> {delta['current']}")
+        else:
+            f = delta["finding"]
+            print(f"[{delta['change'].upper()}] {delta['target']}: "
+                  f"{f.get('severity', 'INFO')} {f.get('issue', '')} ({f.get('device', '')})")
+
+def display_stats(stats):
+    print("\n--- Module timings ---")
+    print(stats.summary())
+
+    report = stats.profile_report()
+    if report:
+        print(f"\n--- cProfile: {stats.profile_module} ---")
+        print(report)
+
 def export_results_to_dashboard(results, output_file="scan_dashboard.html"):
     html_content = """
     <html>
@@ -92,8 +132,15 @@ def main():
         "https://allstack.ai",
         # Add more URLs here
     ]
-    results = run_security_scan(urls_to_scan)
+    # Set profile_module to a module class name (e.g. "WebAudit") to capture
+    # a cProfile report for it
+    stats = EngineStats(profile_module=None)
+    store = ResultStore()  # unchanged targets reuse findings from scan_cache.db
+    results = run_security_scan(urls_to_scan, stats=stats, store=store)
+    store.close()
     display_results(results)
+    display_deltas(ScanHistory().compare_and_save(results=results))
+    display_stats(stats)
     export_results_to_dashboard(results, output_file="scan_report.html")
 
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
 from abc import ABC, abstractmethod
 
 class BaseModule:
+    # Class names of modules that must run (and analyze) before this one
+    DEPENDS_ON = []
+
     def collect(self, context=None):
         """Optional context argument for URLs / targets"""
         return []
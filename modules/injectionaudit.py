@@ -1,5 +1,12 @@
+import gzip
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from modules.basemodule import BaseModule
-import re
+from modules.pattern_matcher import PatternMatcher
 
 class InjectionAudit(BaseModule):
     """
@@ -35,6 +42,14 @@ class InjectionAudit(BaseModule):
         r"benchmark\("
     ]
 
+    # Analysis is a pure function of its input, which is part of the cache key
+    CACHE_TTL = 7 * 24 * 3600
+
+    def __init__(self):
+        # One combined matcher over both pattern lists; ids below
+        # len(PROMPT_INJECTION_PATTERNS) are prompt injection patterns.
+        self.matcher = PatternMatcher(self.PROMPT_INJECTION_PATTERNS + self.SQL_INJECTION_PATTERNS)
+
     def analyze(self, inputs=None, context=None):
         """
         inputs: list of strings to scan (optional)
@@ -49,33 +64,165 @@ class InjectionAudit(BaseModule):
             scan_items.extend(inputs)
 
         if context:
-            for key, value in context.items():
-                if isinstance(value, str):
-                    scan_items.append(value)
-                elif isinstance(value, list):
-                    scan_items.extend([str(v) for v in value])
-                elif isinstance(value, dict):
-                    for sub_val in value.values():
-                        scan_items.append(str(sub_val))
-
-        # Scan all items for prompt injection
+            scan_items.extend(_record_values(context))
+
+        device = context.get("url") if context else None
         for item in scan_items:
-            for pattern in self.PROMPT_INJECTION_PATTERNS:
-                if re.search(pattern, str(item), re.IGNORECASE):
-                    findings.append({
-                        "device": context.get("url", "LLM_INPUT") if context else "LLM_INPUT",
-                        "severity": "HIGH",
-                        "issue": "Prompt Injection Detected",
-                        "details": f"Matched pattern: '{pattern}' in input: '{item}'"
-                    })
-
-            for pattern in self.SQL_INJECTION_PATTERNS:
-                if re.search(pattern, str(item), re.IGNORECASE):
-                    findings.append({
-                        "device": context.get("url", "SQL_INPUT") if context else "SQL_INPUT",
-                        "severity": "HIGH",
-                        "issue": "SQL Injection Attempt Detected",
-                        "details": f"Matched pattern: '{pattern}' in input: '{item}'"
-                    })
-
-        return findings
\ No newline at end of file
+            findings.extend(self._match_item(item, device))
+
+        return findings
+
+    # -----------------------------------------
+    # Streaming mode
+    # -----------------------------------------
+    def analyze_stream(self, source, device=None, fmt=None, fields=None, batch_size=1000, workers=None):
+        """
+        Scan a log file (path or open file) or any iterable of inputs without
+        loading it into memory. Findings are yielded as each batch is scanned
+        and carry the line number they came from.
+
+        fmt: "jsonl" to parse each line as a JSON record; defaults to "jsonl"
+             for *.jsonl paths and plain lines otherwise. Paths ending in .gz
+             are decompressed on the fly.
+        fields: for JSON records, the keys to scan (default: every value)
+        workers: scan batches on this many processes; findings still come
+                 back in input order
+        """
+        batches = _batched(iter_inputs(source, fmt, fields), batch_size)
+
+        if workers and workers > 1:
+            yield from self._analyze_parallel(batches, device, workers)
+            return
+
+        for batch in batches:
+            yield from self._scan_batch(batch, device)
+
+    def _scan_batch(self, batch, device=None):
+        findings = []
+        for line_no, item in batch:
+            for finding in self._match_item(item, device):
+                finding["line"] = line_no
+                findings.append(finding)
+        return findings
+
+    def _analyze_parallel(self, batches, device, workers):
+        # Keep a bounded window of batches in flight so memory stays flat,
+        # and collect them oldest-first so output order matches the input.
+        max_in_flight = workers * 2
+        pending = deque()
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.__class__,)
+        ) as executor:
+            for batch in batches:
+                pending.append(executor.submit(_scan_worker_batch, batch, device))
+                if len(pending) >= max_in_flight:
+                    yield from pending.popleft().result()
+
+            while pending:
+                yield from pending.popleft().result()
+
+    def _match_item(self, item, device=None):
+        # Scan the item for prompt and SQL injection in a single pass
+        findings = []
+        prompt_count = len(self.PROMPT_INJECTION_PATTERNS)
+
+        for pattern_id in self.matcher.matches(item):
+            pattern = self.matcher.patterns[pattern_id]
+            if pattern_id < prompt_count:
+                findings.append({
+                    "device": device or "LLM_INPUT",
+                    "severity": "HIGH",
+                    "issue": "Prompt Injection Detected",
+                    "details": f"Matched pattern: '{pattern}' in input: '{item}'"
+                })
+            else:
+                findings.append({
+                    "device": device or "SQL_INPUT",
+                    "severity": "HIGH",
+                    "issue": "SQL Injection Attempt Detected",
+                    "details": f"Matched pattern: '{pattern}' in input: '{item}'"
+                })
+
+        return findings
+
+
+# -----------------------------------------
+# Process pool workers
+# -----------------------------------------
+_worker_audit = None
+
+
+def _init_worker(audit_class):
+    # Build the audit (and its compiled matcher) once per worker process
+    global _worker_audit
+    _worker_audit = audit_class()
+
+
+def _scan_worker_batch(batch, device):
+    return _worker_audit._scan_batch(batch, device)
+
+
+def iter_inputs(source, fmt=None, fields=None):
+    """
+    Yields (line_number, text) for every input in `source`, which may be a
+    file path, an open text file or any iterable of strings / dicts.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if fmt is None:
+            fmt = "jsonl" if path.endswith((".jsonl", ".jsonl.gz")) else "text"
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            yield from iter_inputs(f, fmt, fields)
+        return
+
+    for line_no, line in enumerate(source, 1):
+        if isinstance(line, dict):
+            for value in _record_values(line, fields):
+                yield line_no, value
+            continue
+
+        line = str(line).rstrip("\r\n")
+        if not line:
+            continue
+
+        if fmt == "jsonl":
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield line_no, line
+                continue
+            if isinstance(record, dict):
+                for value in _record_values(record, fields):
+                    yield line_no, value
+            else:
+                yield line_no, str(record)
+        else:
+            yield line_no, line
+
+
+def _record_values(record, fields=None):
+    values = []
+    for key, value in record.items():
+        if fields and key not in fields:
+            continue
+        if isinstance(value, str):
+            values.append(value)
+        elif isinstance(value, list):
+            values.extend([str(v) for v in value])
+        elif isinstance(value, dict):
+            for sub_val in value.values():
+                values.append(str(sub_val))
+    return values
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
@@ -0,0 +1,66 @@
+import re
+
+REGEX_SPECIAL = set(".^$*+?{}[]\\|()")
+
+
+class PatternMatcher:
+    """
+    Matches a list of regex patterns against a string in one pass.
+
+    All patterns are folded into a single alternation which the re engine
+    scans in C, skipping offsets that can't start any pattern. Python only
+    steps in at offsets where something matched, to confirm which of the
+    patterns sharing that first character actually match there.
+
+    Input is lowercased once per call, so patterns must be written in
+    lower case.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._compiled = [re.compile(p) for p in self.patterns]
+        self._combined = re.compile("|".join(self.patterns))
+
+        # Candidates to confirm at a matched offset, keyed by first character.
+        # Patterns that don't start with a plain literal are always checked.
+        self._by_first = {}
+        self._always = []
+        for pattern_id, pattern in enumerate(self.patterns):
+            first = _literal_prefix(pattern)
+            if first is None:
+                self._always.append(pattern_id)
+            else:
+                self._by_first.setdefault(first, []).append(pattern_id)
+
+    def matches(self, text):
+        """
+        Returns the ids (indexes into `patterns`) of every pattern found in
+        `text`, in pattern order.
+        """
+        text = str(text).lower()
+        found = set()
+
+        m = self._combined.search(text)
+        while m:
+            start = m.start()
+            for pattern_id in self._by_first.get(text[start], ()):
+                if pattern_id not in found and self._compiled[pattern_id].match(text, start):
+                    found.add(pattern_id)
+            for pattern_id in self._always:
+                if pattern_id not in found and self._compiled[pattern_id].match(text, start):
+                    found.add(pattern_id)
+
+            if len(found) == len(self.patterns):
+                break
+            m = self._combined.search(text, start + 1)
+
+        return sorted(found)
+
+
+def _literal_prefix(pattern):
+    """First character of `pattern` if every match must start with it."""
+    if not pattern or pattern[0] in REGEX_SPECIAL or "|" in pattern:
+        return None
+    if len(pattern) > 1 and pattern[1] in "*?{":
+        return None
+    return pattern[0]
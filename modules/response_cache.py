@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Small per-scan LRU of HTTP responses shared by the WebAudit checks.
+
+    Entries are keyed by method, URL and the request headers that were sent.
+    A lookup without an exact hit may still reuse a response fetched with
+    *extra* request headers (e.g. the CORS probe's Origin header), as long as
+    the server didn't declare those headers in its Vary response header.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fetch(self, session, method, url, headers=None, **kwargs):
+        response = self.get(method, url, headers)
+        if response is None:
+            response = session.request(method, url, headers=headers, **kwargs)
+            self.put(method, url, headers, response)
+        return response
+
+    def get(self, method, url, headers=None):
+        wanted = _normalize(headers)
+        key = _key(method, url, wanted)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][1]
+
+            for (m, u, _), (sent, response) in reversed(self._entries.items()):
+                if m == key[0] and u == key[1] and _reusable(sent, response, wanted):
+                    self.hits += 1
+                    return response
+
+            self.misses += 1
+            return None
+
+    def put(self, method, url, headers, response):
+        sent = _normalize(headers)
+        key = _key(method, url, sent)
+
+        with self._lock:
+            self._entries[key] = (sent, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _normalize(headers):
+    return {k.lower(): v for k, v in (headers or {}).items()}
+
+
+def _key(method, url, headers):
+    return method.upper(), url, tuple(sorted(headers.items()))
+
+
+def _reusable(sent, response, wanted):
+    # Everything we want to send must have been sent with the cached request
+    for name, value in wanted.items():
+        if sent.get(name) != value:
+            return False
+
+    extra = set(sent) - set(wanted)
+    if not extra:
+        return True
+
+    vary = {v.strip().lower() for v in response.headers.get("Vary", "").split(",") if v.strip()}
+    return "*" not in vary and not (extra & vary)
@@ -1,7 +1,102 @@
+import asyncio
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from modules.response_cache import ResponseCache
+
+
+# Response headers that change between requests without the site changing
+VOLATILE_HEADERS = {
+    "date",
+    "age",
+    "expires",
+    "set-cookie",
+    "x-request-id",
+    "x-amz-request-id",
+    "cf-ray",
+    "x-cache",
+    "x-served-by",
+    "x-timer",
+    "server-timing",
+    "report-to",
+    "nel"
+}
+
+
+def create_session(max_per_host=4, max_hosts=256):
+    """
+    Shared keep-alive session. Connections are pooled per host and capped at
+    `max_per_host`; extra requests to the same host wait for a free socket.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=max_hosts,
+        pool_maxsize=max_per_host,
+        pool_block=True
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
 
 class WebAudit:
 
+    # Reuse cached findings for a day while the target's fingerprint holds
+    CACHE_TTL = 24 * 3600
+
+    CHECKS = [
+        "_check_cors",
+        "_check_robots",
+        "_check_security_headers",
+        "_check_http_methods"
+    ]
+
+    # Checks that run back-to-back in the async engine so the later one can
+    # reuse the earlier one's cached response instead of racing it.
+    CHECK_GROUPS = [
+        ["_check_cors", "_check_security_headers"],
+        ["_check_robots"],
+        ["_check_http_methods"]
+    ]
+
+    def __init__(self, session=None, timeout=5, max_per_host=4, max_workers=64):
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_workers = max_workers
+        self.session = session or create_session(max_per_host=max_per_host)
+        self._executor = None
+        self._host_slots = {}
+        self._slots_loop = None
+
+    def fingerprint(self, context=None):
+        """
+        Cheap change detector for incremental rescans: one HEAD request whose
+        status, ETag, Last-Modified and other stable headers are hashed.
+        Returns None when the target can't be reached so it is always
+        rescanned.
+        """
+        url = context.get("url") if context else None
+        if not url:
+            return None
+
+        try:
+            r = self.session.head(url, timeout=self.timeout)
+        except Exception:
+            return None
+
+        headers = {
+            k.lower(): v
+            for k, v in r.headers.items()
+            if k.lower() not in VOLATILE_HEADERS
+        }
+        data = json.dumps([url, r.status_code, headers], sort_keys=True)
+        return hashlib.sha256(data.encode()).hexdigest()
+
     def scan(self, context=None):
         findings = []
         url = context.get("url") if context else None
@@ -9,23 +104,95 @@ class WebAudit:
         if not url:
             return findings
 
-        findings += self._check_cors(url)
-        findings += self._check_robots(url)
-        findings += self._check_security_headers(url)
-        findings += self._check_http_methods(url)
+        cache = ResponseCache()
+        for check in self.CHECKS:
+            findings += getattr(self, check)(url, cache)
 
         return findings
 
+    # -----------------------------------------
+    # Async engine
+    # -----------------------------------------
+    async def scan_async(self, context=None):
+        """
+        Same findings as scan(), but the check groups run concurrently over
+        the shared connection pool.
+        """
+        url = context.get("url") if context else None
+
+        if not url:
+            return []
+
+        cache = ResponseCache()
+        results = {}
+        for group_results in await asyncio.gather(
+            *(self._run_checks(group, url, cache) for group in self.CHECK_GROUPS)
+        ):
+            results.update(group_results)
+
+        findings = []
+        for check in self.CHECKS:
+            findings += results[check]
+        return findings
+
+    async def scan_many(self, urls):
+        """
+        Audit many URLs at once. Returns {url: findings}.
+        """
+        results = await asyncio.gather(*(self.scan_async({"url": url}) for url in urls))
+        return dict(zip(urls, results))
+
+    def scan_all(self, urls):
+        """Blocking wrapper around scan_many()."""
+        return asyncio.run(self.scan_many(urls))
+
+    async def _run_checks(self, checks, url, cache):
+        loop = asyncio.get_running_loop()
+        async with self._host_slot(url):
+            return await loop.run_in_executor(
+                self._get_executor(),
+                lambda: {check: getattr(self, check)(url, cache) for check in checks}
+            )
+
+    def _host_slot(self, url):
+        # Keep per-host concurrency in step with the connection pool so
+        # executor threads don't sit blocked waiting for a socket.
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots_loop = loop
+            self._host_slots = {}
+
+        host = urlsplit(url).netloc
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_slots[host]
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self.session.close()
+
+    def _request(self, method, url, cache=None, headers=None):
+        if cache is None:
+            return self.session.request(method, url, headers=headers, timeout=self.timeout)
+        return cache.fetch(self.session, method, url, headers=headers, timeout=self.timeout)
+
     # -----------------------------------------
     # 1️⃣ CORS Misconfiguration Check
     # -----------------------------------------
-    def _check_cors(self, url):
+    def _check_cors(self, url, cache=None):
         findings = []
         try:
             headers = {
                 "Origin": "https://evil.com"
             }
-            r = requests.get(url, headers=headers, timeout=5)
+            r = self._request("GET", url, cache, headers=headers)
 
             acao = r.headers.get("Access-Control-Allow-Origin")
 
@@ -44,11 +211,11 @@ class WebAudit:
     # -----------------------------------------
     # 2️⃣ robots.txt Exposure
     # -----------------------------------------
-    def _check_robots(self, url):
+    def _check_robots(self, url, cache=None):
         findings = []
         try:
             robots_url = url.rstrip("/") + "/robots.txt"
-            r = requests.get(robots_url, timeout=5)
+            r = self._request("GET", robots_url, cache)
 
             if r.status_code == 200 and "Disallow" in r.text:
                 findings.append({
@@ -65,10 +232,10 @@ class WebAudit:
     # -----------------------------------------
     # 3️⃣ Security Headers Check
     # -----------------------------------------
-    def _check_security_headers(self, url):
+    def _check_security_headers(self, url, cache=None):
         findings = []
         try:
-            r = requests.get(url, timeout=5)
+            r = self._request("GET", url, cache)
             headers = r.headers
 
             required_headers = [
@@ -94,10 +261,10 @@ class WebAudit:
     # -----------------------------------------
     # 4️⃣ HTTP Methods Check
     # -----------------------------------------
-    def _check_http_methods(self, url):
+    def _check_http_methods(self, url, cache=None):
         findings = []
         try:
-            r = requests.options(url, timeout=5)
+            r = self._request("OPTIONS", url, cache)
             allow = r.headers.get("Allow")
 
             if allow:
@@ -1,12 +1,26 @@
-from scapy.all import sniff, IP, TCP, UDP, ICMP
-import json
+from scapy.all import sniff, PcapReader, IP, IPv6, TCP, UDP, ICMP
+from collections import deque
 from datetime import datetime
+from itertools import islice
+import argparse
 import threading
+import time
 
-OUTPUT_FILE = "packet_log.json"
+from report_sink import JsonlSink
+from flows import FlowTable, IDLE_TIMEOUT
+import packet_decode
+
+OUTPUT_FILE = "packet_log.jsonl"
 PACKET_LIMIT = 100
-packet_data = []
 lock = threading.Lock()
+# When set, records are streamed here
+sink = None
+# When set, packets go to this CapturePipeline and nothing is printed per packet
+pipeline = None
+# When set, packets are aggregated here and one record per flow is written
+flows = None
+# Print a line per packet (live capture without a pipeline)
+verbose = True
 
 def classify_risk(packet_info):
     risk = "LOW"
@@ -22,61 +36,310 @@ def classify_risk(packet_info):
 
     return risk
 
-def process_packet(packet):
+def extract_packet_info(packet):
     if IP in packet:
-        packet_info = {
-            "timestamp": str(datetime.now()),
-            "src_ip": packet[IP].src,
-            "dst_ip": packet[IP].dst,
-            "protocol": packet[IP].proto,
-            "length": len(packet)
-        }
-
-        if TCP in packet:
-            packet_info.update({
-                "protocol_name": "TCP",
-                "src_port": packet[TCP].sport,
-                "dst_port": packet[TCP].dport,
-                "flags": str(packet[TCP].flags)
-            })
-
-        elif UDP in packet:
-            packet_info.update({
-                "protocol_name": "UDP",
-                "src_port": packet[UDP].sport,
-                "dst_port": packet[UDP].dport
-            })
-
-        elif ICMP in packet:
-            packet_info.update({
-                "protocol_name": "ICMP",
-                "type": packet[ICMP].type,
-                "code": packet[ICMP].code
-            })
-
-        packet_info["risk_level"] = classify_risk(packet_info)
+        ip = packet[IP]
+        proto = ip.proto
+    elif IPv6 in packet:
+        ip = packet[IPv6]
+        proto = ip.nh
+    else:
+        return None
+
+    packet_info = {
+        "timestamp": str(datetime.fromtimestamp(float(packet.time))),
+        "src_ip": ip.src,
+        "dst_ip": ip.dst,
+        "protocol": proto,
+        "length": len(packet)
+    }
+
+    if TCP in packet:
+        packet_info.update({
+            "protocol_name": "TCP",
+            "src_port": packet[TCP].sport,
+            "dst_port": packet[TCP].dport,
+            "flags": str(packet[TCP].flags)
+        })
+
+    elif UDP in packet:
+        packet_info.update({
+            "protocol_name": "UDP",
+            "src_port": packet[UDP].sport,
+            "dst_port": packet[UDP].dport
+        })
+
+    elif ICMP in packet:
+        packet_info.update({
+            "protocol_name": "ICMP",
+            "type": packet[ICMP].type,
+            "code": packet[ICMP].code
+        })
+
+    return packet_info
+
+def process_packet(packet):
+    packet_info = extract_packet_info(packet)
+    if packet_info is None:
+        return
+    record_packet(packet_info, float(packet.time))
+
+def process_frames(frames):
+    """
+    Fast path: decodes (frame bytes, linktype, timestamp) tuples with
+    packet_decode instead of scapy dissection. Returns the number of frames.
+    """
+    decode = packet_decode.decode_frame
+    seen = 0
+    for data, linktype, timestamp in frames:
+        seen += 1
+        packet_info = decode(data, linktype, timestamp)
+        if packet_info is not None:
+            record_packet(packet_info, timestamp)
+    return seen
+
+def record_packet(packet_info, timestamp=None):
+    if flows is not None:
+        flows.add(packet_info, timestamp if timestamp is not None else time.time())
+        return
 
+    packet_info["risk_level"] = classify_risk(packet_info)
+    write_record(packet_info)
+
+def write_record(record):
+    # Shared by per-packet and flow records
+    if pipeline is not None:
+        pipeline.put(record)
+        return
+
+    if sink is not None:
         with lock:
-            packet_data.append(packet_info)
+            sink.write(record)
 
-        print(f"[{packet_info['risk_level']}] "
-              f"{packet_info['protocol_name']} "
-              f"{packet_info['src_ip']}:{packet_info.get('src_port', '')} "
-              f"-> {packet_info['dst_ip']}:{packet_info.get('dst_port', '')}")
+    if verbose:
+        counts = f" ({record['packets']} pkts, {record['bytes']} bytes)" if "packets" in record else ""
+        print(f"[{record['risk_level']}] "
+              f"{record.get('protocol_name', record['protocol'])} "
+              f"{record['src_ip']}:{record.get('src_port', '')} "
+              f"-> {record['dst_ip']}:{record.get('dst_port', '')}{counts}")
 
-def save_to_json():
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(packet_data, f, indent=4)
-    print(f"\n[+] Packet log saved to {OUTPUT_FILE}")
+def enable_flows(idle_timeout=IDLE_TIMEOUT):
+    """
+    Switches recording to flow aggregation: packets update a FlowTable and
+    a record is written per finished flow instead of per packet. Call
+    disable_flows() at the end of the capture to write the open flows.
+    """
+    global flows
+    flows = FlowTable(write_record, classify=classify_risk, idle_timeout=idle_timeout)
+
+def disable_flows():
+    global flows
+    if flows is not None:
+        table, flows = flows, None
+        table.flush()
+
+
+class CapturePipeline:
+    """
+    Long-running capture path: the sniffer thread only appends to a bounded
+    ring buffer, and a writer thread drains it in batches to a JsonlSink.
+
+    When the writer falls behind, the oldest buffered packets are dropped
+    (and counted) rather than letting memory grow. A one-line status is
+    printed every `stats_interval` seconds instead of a line per packet.
+    """
+
+    def __init__(self, output=OUTPUT_FILE, capacity=100000, batch_size=1000,
+                 flush_interval=1.0, stats_interval=10):
+        self.output = output
+        self.buffer = deque(maxlen=capacity)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.stats_interval = stats_interval
+        self.captured = 0
+        self.written = 0
+        self.dropped = 0
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def put(self, packet_info):
+        # deque.append is thread-safe; a full deque silently evicts the oldest
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(packet_info)
+        self.captured += 1
+        if len(self.buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="packet-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        last_stats = time.monotonic()
+
+        with JsonlSink(self.output, flush_every=self.batch_size) as out:
+            while not self._stopping.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                self._drain(out)
+
+                if self.stats_interval and time.monotonic() - last_stats >= self.stats_interval:
+                    print(self.status())
+                    last_stats = time.monotonic()
+
+            self._drain(out)
+
+    def _drain(self, out):
+        while self.buffer:
+            batch = []
+            while self.buffer and len(batch) < self.batch_size:
+                batch.append(self.buffer.popleft())
+            out.write_many(batch)
+            self.written += len(batch)
+        out.flush()
+
+    def status(self):
+        return (f"[stats] captured={self.captured} written={self.written} "
+                f"dropped={self.dropped} buffered={len(self.buffer)}")
+
+
+def start_sniffing(fast=False, iface=None):
+    global sink
 
-def start_sniffing():
     print("=" * 60)
     print("[+] Defensive Packet Analyzer Started")
     print(f"[+] Capturing {PACKET_LIMIT} packets")
     print("=" * 60)
 
-    sniff(prn=process_packet, count=PACKET_LIMIT)
-    save_to_json()
+    sink = JsonlSink(OUTPUT_FILE)
+    try:
+        if fast:
+            process_frames(packet_decode.capture_frames(iface=iface, count=PACKET_LIMIT))
+        else:
+            sniff(prn=process_packet, count=PACKET_LIMIT, iface=iface)
+    finally:
+        disable_flows()
+        sink.close()
+        sink = None
+    print(f"\n[+] Packet log saved to {OUTPUT_FILE}")
+
+def start_continuous(count=0, iface=None, output=OUTPUT_FILE, capacity=100000, fast=False):
+    """
+    Captures until interrupted (or `count` packets if non-zero) through a
+    CapturePipeline, without storing packets in scapy or printing each one.
+    With fast=True frames come from a raw socket and skip scapy entirely.
+    """
+    global pipeline
+
+    print("=" * 60)
+    print("[+] Defensive Packet Analyzer Started (continuous)")
+    print(f"[+] Writing to {output}, buffer {capacity} packets. Ctrl+C to stop.")
+    print("=" * 60)
+
+    pipeline = CapturePipeline(output=output, capacity=capacity)
+    pipeline.start()
+    try:
+        if fast:
+            process_frames(packet_decode.capture_frames(iface=iface, count=count))
+        else:
+            sniff(prn=process_packet, count=count, iface=iface, store=False)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        disable_flows()
+        pipeline.stop()
+        print(pipeline.status())
+        pipeline = None
+    print(f"\n[+] Packet log saved to {output}")
+
+def analyze_pcap(path, output=OUTPUT_FILE, limit=0, fast=False):
+    """
+    Runs a pcap / pcapng file through process_packet, streaming it packet by
+    packet, and writes the records to `output`. Returns throughput stats.
+    With fast=True the raw frames are decoded by packet_decode instead.
+    """
+    global sink, verbose
+
+    print("=" * 60)
+    print(f"[+] Offline analysis of {path}")
+    print("=" * 60)
+
+    packets = 0
+    previous_verbose = verbose
+    sink = JsonlSink(output, flush_every=1000)
+    verbose = False
+    started = time.perf_counter()
+    try:
+        if fast:
+            frames = packet_decode.read_pcap_frames(path)
+            if limit:
+                frames = islice(frames, limit)
+            packets = process_frames(frames)
+        else:
+            with PcapReader(path) as reader:
+                for packet in reader:
+                    packets += 1
+                    process_packet(packet)
+                    if limit and packets >= limit:
+                        break
+    finally:
+        disable_flows()
+        elapsed = time.perf_counter() - started
+        recorded = sink.count
+        sink.close()
+        sink = None
+        verbose = previous_verbose
+
+    stats = {
+        "packets": packets,
+        "recorded": recorded,
+        "seconds": round(elapsed, 3),
+        "packets_per_sec": round(packets / elapsed, 1) if elapsed else 0.0
+    }
+    print(f"[+] {packets} packets ({recorded} records) in {stats['seconds']}s "
+          f"-> {stats['packets_per_sec']} packets/sec")
+    print(f"[+] Packet log saved to {output}")
+    return stats
 
 if __name__ == "__main__":
-    start_sniffing()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Defensive Packet Analyzer")
+    parser.add_argument("--count", type=int,
+                        help=f"packets to capture (default {PACKET_LIMIT}, or until "
+                             f"interrupted with --continuous; 0 = until interrupted)")
+    parser.add_argument("--continuous", action="store_true",
+                        help="long-running mode: ring buffer, background writer, no per-packet output")
+    parser.add_argument("--iface", help="interface to capture on")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--buffer", type=int, default=100000, help="ring buffer size (continuous mode)")
+    parser.add_argument("--pcap", help="analyse a pcap/pcapng file instead of capturing live")
+    parser.add_argument("--fast", action="store_true",
+                        help="decode raw frames directly instead of full scapy dissection "
+                             "(live capture needs Linux AF_PACKET)")
+    parser.add_argument("--flows", action="store_true",
+                        help="write one record per flow (5-tuple) instead of per packet")
+    parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT,
+                        help=f"seconds without packets before a flow is closed (default {IDLE_TIMEOUT})")
+    args = parser.parse_args()
+
+    if args.flows:
+        enable_flows(idle_timeout=args.idle_timeout)
+
+    if args.pcap:
+        analyze_pcap(args.pcap, output=args.output, limit=args.count or 0, fast=args.fast)
+    elif args.continuous:
+        start_continuous(count=args.count or 0, iface=args.iface,
+                         output=args.output, capacity=args.buffer, fast=args.fast)
+    else:
+        OUTPUT_FILE = args.output
+        if args.count is not None:
+            PACKET_LIMIT = args.count
+        start_sniffing(fast=args.fast, iface=args.iface)
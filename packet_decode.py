@@ -0,0 +1,234 @@
+# packet_decode.py
+import socket
+import struct
+import time
+from datetime import datetime
+
+# pcap link-layer types
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETH_P_IP = 0x0800
+ETH_P_IPV6 = 0x86DD
+VLAN_TYPES = (0x8100, 0x88A8, 0x9100)
+
+# IPv6 extension headers that are skipped to reach TCP / UDP
+IPV6_EXTENSIONS = (0, 43, 60)
+IPV6_FRAGMENT = 44
+
+# Same letter order scapy uses for str(packet[TCP].flags)
+TCP_FLAG_LETTERS = "FSRPAUECN"
+
+_u16 = struct.Struct("!H")
+_ports = struct.Struct("!HH")
+
+
+def decode_frame(data, linktype=LINKTYPE_ETHERNET, timestamp=None):
+    """
+    Decodes the IP / TCP / UDP / ICMP fields packet.extract_packet_info
+    reports straight from the raw frame bytes, without building scapy
+    layers. Returns the same packet_info dict, or None for frames that are
+    not IPv4 / IPv6 (or are too short to tell).
+
+    timestamp: capture time in seconds since the epoch
+    """
+    view = memoryview(data)
+    try:
+        offset, ethertype = _link_offset(view, linktype)
+        if offset is None:
+            return None
+        return _decode_ip(view, offset, ethertype, len(view), timestamp)
+    except (IndexError, struct.error):
+        # Truncated headers: treat like scapy would a malformed packet
+        return None
+
+
+def _link_offset(view, linktype):
+    """Returns (offset of the IP header, ethertype or None if unknown)."""
+    if linktype == LINKTYPE_ETHERNET:
+        ethertype = _u16.unpack_from(view, 12)[0]
+        offset = 14
+        while ethertype in VLAN_TYPES:
+            ethertype = _u16.unpack_from(view, offset + 2)[0]
+            offset += 4
+        return offset, ethertype
+
+    if linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        return 0, None
+
+    if linktype == LINKTYPE_LINUX_SLL:
+        return 16, _u16.unpack_from(view, 14)[0]
+
+    if linktype == LINKTYPE_LINUX_SLL2:
+        return 20, _u16.unpack_from(view, 0)[0]
+
+    if linktype == LINKTYPE_NULL:
+        # 4-byte address family in host byte order; the version nibble is enough
+        return 4, None
+
+    return None, None
+
+
+def _decode_ip(view, offset, ethertype, length, timestamp):
+    version = view[offset] >> 4
+
+    if ethertype is not None and ethertype not in (ETH_P_IP, ETH_P_IPV6):
+        return None
+
+    if version == 4:
+        header_len = (view[offset] & 0x0F) * 4
+        proto = view[offset + 9]
+        fragment_offset = _u16.unpack_from(view, offset + 6)[0] & 0x1FFF
+        packet_info = {
+            "timestamp": _timestamp(timestamp),
+            "src_ip": _ipv4(view, offset + 12),
+            "dst_ip": _ipv4(view, offset + 16),
+            "protocol": proto,
+            "length": length
+        }
+        if fragment_offset:
+            # Later fragments carry no transport header
+            return packet_info
+        return _decode_transport(view, offset + header_len, proto, packet_info, icmp=True)
+
+    if version == 6:
+        next_header = view[offset + 6]
+        packet_info = {
+            "timestamp": _timestamp(timestamp),
+            "src_ip": _ipv6(view, offset + 8),
+            "dst_ip": _ipv6(view, offset + 24),
+            "protocol": next_header,
+            "length": length
+        }
+
+        offset += 40
+        try:
+            while next_header in IPV6_EXTENSIONS:
+                next_header, ext_len = view[offset], view[offset + 1]
+                offset += (ext_len + 1) * 8
+            if next_header == IPV6_FRAGMENT:
+                if _u16.unpack_from(view, offset + 2)[0] & 0xFFF8:
+                    return packet_info
+                next_header = view[offset]
+                offset += 8
+        except (IndexError, struct.error):
+            return packet_info
+
+        return _decode_transport(view, offset, next_header, packet_info, icmp=False)
+
+    return None
+
+
+def _decode_transport(view, offset, proto, packet_info, icmp):
+    # A transport header cut short (e.g. by the capture snaplen) leaves the
+    # IP-level fields, as scapy does
+    try:
+        return _transport_fields(view, offset, proto, packet_info, icmp)
+    except (IndexError, struct.error):
+        return packet_info
+
+
+def _transport_fields(view, offset, proto, packet_info, icmp):
+    if proto == 6:
+        src_port, dst_port = _ports.unpack_from(view, offset)
+        flags = ((view[offset + 12] & 0x01) << 8) | view[offset + 13]
+        packet_info.update({
+            "protocol_name": "TCP",
+            "src_port": src_port,
+            "dst_port": dst_port,
+            "flags": _FLAG_STRINGS[flags]
+        })
+
+    elif proto == 17:
+        src_port, dst_port = _ports.unpack_from(view, offset)
+        packet_info.update({
+            "protocol_name": "UDP",
+            "src_port": src_port,
+            "dst_port": dst_port
+        })
+
+    elif proto == 1 and icmp:
+        packet_info.update({
+            "protocol_name": "ICMP",
+            "type": view[offset],
+            "code": view[offset + 1]
+        })
+
+    return packet_info
+
+
+def tcp_flags(value):
+    return "".join(letter for bit, letter in enumerate(TCP_FLAG_LETTERS) if value & (1 << bit))
+
+
+# All 512 combinations of the 9 flag bits, built once
+_FLAG_STRINGS = [tcp_flags(value) for value in range(512)]
+
+
+def _ipv4(view, offset):
+    return socket.inet_ntoa(view[offset:offset + 4])
+
+
+def _ipv6(view, offset):
+    return socket.inet_ntop(socket.AF_INET6, view[offset:offset + 16])
+
+
+def _timestamp(timestamp):
+    if timestamp is None:
+        return str(datetime.now())
+    return str(datetime.fromtimestamp(timestamp))
+
+
+# -------------------------------------------------
+# Raw frame sources
+# -------------------------------------------------
+def read_pcap_frames(path):
+    """
+    Yields (frame bytes, linktype, timestamp) from a pcap or pcapng file
+    without dissecting anything.
+    """
+    from scapy.utils import RawPcapReader
+
+    with RawPcapReader(path) as reader:
+        default_linktype = getattr(reader, "linktype", LINKTYPE_ETHERNET)
+        for data, meta in reader:
+            if hasattr(meta, "tshigh"):
+                # pcapng: 64-bit timestamp in units of 1/tsresol seconds
+                timestamp = ((meta.tshigh << 32) | meta.tslow) / meta.tsresol
+                yield data, meta.linktype, timestamp
+            else:
+                yield data, default_linktype, meta.sec + meta.usec / 1e6
+
+
+# Linux ARPHRD_* hardware types whose AF_PACKET frames start with an Ethernet header
+_ETHERNET_HATYPES = (1, 772)
+
+
+def capture_frames(iface=None, count=0, bufsize=65536):
+    """
+    Yields (frame bytes, linktype, timestamp) from a Linux AF_PACKET socket,
+    bypassing scapy entirely. Needs root (or CAP_NET_RAW). `count` of 0
+    captures until interrupted. Each frame is a view into a reused buffer,
+    so decode it before asking for the next one.
+    """
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(0x0003))
+    if iface:
+        sock.bind((iface, 0))
+
+    buffer = bytearray(bufsize)
+    view = memoryview(buffer)
+    seen = 0
+    try:
+        while not count or seen < count:
+            size, address = sock.recvfrom_into(buffer)
+            # address: (ifname, ethertype, pkttype, hatype, hwaddr)
+            linktype = LINKTYPE_ETHERNET if address[3] in _ETHERNET_HATYPES else LINKTYPE_RAW
+            seen += 1
+            yield view[:size], linktype, time.time()
+    finally:
+        sock.close()
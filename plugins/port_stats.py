@@ -1,6 +1,14 @@
 # plugins/port_stats.py
+from portset import PortSet
 
 def run(open_ports):
+    """
+    open_ports: PortSet or any iterable of port numbers.
+    Returns {port: service name} in ascending port order.
+    """
+    if not isinstance(open_ports, PortSet):
+        open_ports = PortSet(open_ports)
+
     result = {}
 
     common_ports = {
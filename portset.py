@@ -0,0 +1,146 @@
+# portset.py
+from array import array
+from bisect import bisect_left
+
+MAX_PORT = 65535
+BITMAP_BYTES = (MAX_PORT + 1) // 8
+# Above this many ports a 8 KiB bitmap is smaller than the sorted array
+DENSE_THRESHOLD = BITMAP_BYTES // 2
+
+
+class PortSet:
+    """
+    Compact set of port numbers for one host.
+
+    Sparse sets (the usual case: a handful of open ports) are kept as a
+    sorted array of unsigned shorts, 2 bytes per port. Once a set grows past
+    DENSE_THRESHOLD ports it switches to a 65536-bit bitmap (8 KiB), so even
+    a host answering on every port stays small. Union / difference /
+    intersection run on whole-bitmap integers; iteration is always in
+    ascending port order.
+    """
+
+    __slots__ = ("_ports", "_bitmap")
+
+    def __init__(self, ports=()):
+        self._ports = array("H", sorted(set(ports)))
+        self._bitmap = None
+        self._compact()
+
+    # -------------------------------------------------
+    # Construction
+    # -------------------------------------------------
+    @classmethod
+    def from_mask(cls, mask):
+        portset = cls()
+        portset._set_mask(mask)
+        return portset
+
+    def add(self, port):
+        if self._bitmap is not None:
+            self._bitmap[port >> 3] |= 1 << (port & 7)
+            return
+
+        i = bisect_left(self._ports, port)
+        if i == len(self._ports) or self._ports[i] != port:
+            self._ports.insert(i, port)
+            self._compact()
+
+    def update(self, ports):
+        self._set_mask(self.mask() | PortSet(ports).mask())
+
+    # -------------------------------------------------
+    # Set operations
+    # -------------------------------------------------
+    def mask(self):
+        """The set as an integer with bit `port` set for every port."""
+        if self._bitmap is not None:
+            return int.from_bytes(self._bitmap, "little")
+        mask = 0
+        for port in self._ports:
+            mask |= 1 << port
+        return mask
+
+    def union(self, other):
+        return PortSet.from_mask(self.mask() | _as_portset(other).mask())
+
+    def difference(self, other):
+        return PortSet.from_mask(self.mask() & ~_as_portset(other).mask())
+
+    def intersection(self, other):
+        return PortSet.from_mask(self.mask() & _as_portset(other).mask())
+
+    __or__ = union
+    __sub__ = difference
+    __and__ = intersection
+
+    # -------------------------------------------------
+    # Container protocol
+    # -------------------------------------------------
+    def __contains__(self, port):
+        if not isinstance(port, int) or not 0 <= port <= MAX_PORT:
+            return False
+        if self._bitmap is not None:
+            return bool(self._bitmap[port >> 3] & (1 << (port & 7)))
+        i = bisect_left(self._ports, port)
+        return i < len(self._ports) and self._ports[i] == port
+
+    def __iter__(self):
+        if self._bitmap is None:
+            return iter(self._ports)
+        return self._iter_bitmap()
+
+    def _iter_bitmap(self):
+        for index, byte in enumerate(self._bitmap):
+            if byte:
+                base = index << 3
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield base + bit
+
+    def __len__(self):
+        if self._bitmap is not None:
+            return self.mask().bit_count()
+        return len(self._ports)
+
+    def __eq__(self, other):
+        if isinstance(other, PortSet):
+            return self.mask() == other.mask()
+        return NotImplemented
+
+    def __repr__(self):
+        return f"PortSet({self.to_list()})"
+
+    def to_list(self):
+        return list(self)
+
+    def nbytes(self):
+        """Approximate payload size in bytes."""
+        if self._bitmap is not None:
+            return len(self._bitmap)
+        return self._ports.itemsize * len(self._ports)
+
+    # -------------------------------------------------
+    # Internals
+    # -------------------------------------------------
+    def _set_mask(self, mask):
+        if mask.bit_count() > DENSE_THRESHOLD:
+            self._ports = array("H")
+            self._bitmap = bytearray(mask.to_bytes(BITMAP_BYTES, "little"))
+            return
+
+        ports = array("H")
+        while mask:
+            low = mask & -mask
+            ports.append(low.bit_length() - 1)
+            mask ^= low
+        self._ports = ports
+        self._bitmap = None
+
+    def _compact(self):
+        if self._bitmap is None and len(self._ports) > DENSE_THRESHOLD:
+            self._set_mask(self.mask())
+
+
+def _as_portset(ports):
+    return ports if isinstance(ports, PortSet) else PortSet(ports)
@@ -0,0 +1,117 @@
+# report_sink.py
+import gzip
+import io
+import json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class JsonlSink:
+    """
+    Appends report records to a JSON Lines file as they are produced, so
+    memory stays flat and a crash only loses the records not yet flushed.
+
+    compress: None, "gzip" or "zstd"; inferred from a .gz / .zst suffix
+              when not given. zstd needs the optional `zstandard` package.
+    compact: write without spaces after separators
+    flush_every: flush to disk after this many records
+    """
+
+    def __init__(self, path, compress=None, compact=True, flush_every=1, append=True):
+        self.path = path
+        self.compress = compress or _compression_for(path)
+        self.separators = (",", ":") if compact else (", ", ": ")
+        self.flush_every = flush_every
+        self.count = 0
+        self._pending = 0
+        self._raw = None
+        self._file = self._open("a" if append else "w")
+
+    def _open(self, mode):
+        if self.compress == "gzip":
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+
+        if self.compress == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstd output needs the 'zstandard' package (pip install zstandard)")
+            self._raw = open(self.path, mode + "b")
+            writer = zstandard.ZstdCompressor().stream_writer(self._raw)
+            return io.TextIOWrapper(writer, encoding="utf-8")
+
+        return open(self.path, mode, encoding="utf-8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, separators=self.separators, default=str))
+        self._file.write("\n")
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        # For zstd this ends the current block, so everything written so far
+        # is decodable even if the process dies before close()
+        self._file.flush()
+        self._pending = 0
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        if self._raw is not None:
+            self._raw.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_jsonl(path, compress=None):
+    """
+    Yields the records of a JSON Lines file written by JsonlSink. A file cut
+    short by a crash yields every complete record before the break.
+    """
+    compress = compress or _compression_for(path)
+
+    if compress == "gzip":
+        f = gzip.open(path, "rt", encoding="utf-8")
+    elif compress == "zstd":
+        if zstandard is None:
+            raise RuntimeError("reading zstd needs the 'zstandard' package (pip install zstandard)")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        f = io.TextIOWrapper(reader, encoding="utf-8")
+    else:
+        f = open(path, "r", encoding="utf-8")
+
+    with f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # Last line of an interrupted write
+                    return
+        except (EOFError, OSError):
+            return
+
+
+def _compression_for(path):
+    path = str(path)
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
@@ -1,12 +1,63 @@
 # reporter.py
 import json
+import os
+import weakref
 from datetime import datetime
 
-def generate_report(target, open_ports):
+from diffing import diff_ports
+from portset import PortSet
+from report_sink import read_jsonl
+
+REPORT_FILE = "report.json"
+
+# Sink -> {target: open ports of its last record}; the sink's file is read
+# once, later records are tracked here
+_sink_history = weakref.WeakKeyDictionary()
+
+def generate_report(target, open_ports, sink=None):
+    """
+    open_ports: PortSet or any iterable of port numbers
+    sink: optional report_sink.JsonlSink; the report is appended to it as
+          one record instead of rewriting report.json
+    Returns the ports opened / closed since the previous report for the
+    same target (see diffing.diff_ports): the last record for it in the
+    sink, or report.json if it is for the same target.
+    """
+    if not isinstance(open_ports, PortSet):
+        open_ports = PortSet(open_ports)
+
     report = {
         "target": target,
         "time": str(datetime.now()),
-        "open_ports": open_ports
+        "open_ports": open_ports.to_list()
     }
-    with open("report.json", "w") as f:
-        json.dump(report, f, indent=4)
\ No newline at end of file
+
+    previous = {}
+    if sink is not None:
+        history = _last_reports(sink)
+        if target in history:
+            previous = {target: history[target]}
+        sink.write(report)
+        history[target] = report["open_ports"]
+    else:
+        if os.path.exists(REPORT_FILE):
+            with open(REPORT_FILE, "r") as f:
+                old = json.load(f)
+            if isinstance(old, dict) and old.get("target") == target:
+                previous = {target: old.get("open_ports", [])}
+
+        with open(REPORT_FILE, "w") as f:
+            json.dump(report, f, indent=4)
+
+    return diff_ports(previous, {target: open_ports}) if previous else []
+
+def _last_reports(sink):
+    history = _sink_history.get(sink)
+    if history is None:
+        history = _sink_history[sink] = {}
+        # Make records this process already wrote readable
+        sink.flush()
+        for record in read_jsonl(sink.path, sink.compress):
+            if isinstance(record, dict) and "target" in record:
+                history[record["target"]] = record.get("open_ports", [])
+    return history
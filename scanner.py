@@ -1,5 +1,28 @@
+import asyncio
+import errno
+import ipaddress
 import socket
-from concurrent.futures import ThreadPoolExecutor
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows: no RLIMIT_NOFILE to respect
+    resource = None
+
+from banner import grab_banner_async
+from portset import PortSet
+
+DEFAULT_CONCURRENCY = 1000
+BANNER_CONCURRENCY = 500
+INITIAL_TIMEOUT = 1.0
+MIN_TIMEOUT = 0.25
+MAX_TIMEOUT = 3.0
+# File descriptors left for everything that isn't a probe socket
+FD_HEADROOM = 64
+# Wait before retrying when the process is out of sockets
+FD_RETRY_DELAY = 0.05
+FD_EXHAUSTED = (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM)
 
 def scan_port(target, port):
     try:
@@ -13,11 +36,353 @@ def scan_port(target, port):
         pass
     return None
 
-def scan_target(target, ports):
-    open_ports = []
-    with ThreadPoolExecutor(max_workers=100) as executor:
-        results = executor.map(lambda p: scan_port(target, p), ports)
-    for r in results:
-        if r:
-            open_ports.append(r)
-    return open_ports
\ No newline at end of file
+def scan_target(target, ports, concurrency=DEFAULT_CONCURRENCY, rate=None, checkpoint=None):
+    """
+    Returns the open ports of `target`, in the order given in `ports`.
+    Runs the asyncio connect engine; see scan_target_async().
+    """
+    return asyncio.run(scan_target_async(
+        target, ports, concurrency=concurrency, rate=rate, checkpoint=checkpoint
+    ))
+
+async def scan_target_async(target, ports, concurrency=DEFAULT_CONCURRENCY, rate=None,
+                            timeout=None, checkpoint=None):
+    """
+    concurrency: max connects in flight at once
+    rate: optional cap on new connects per second
+    timeout: fixed connect timeout; by default it adapts to the RTT measured
+             from completed (open or refused) connects
+    checkpoint: optional checkpoint.ScanCheckpoint to record progress in
+                (and resume from)
+    """
+    ports = list(ports)
+    found = PortSet()
+    async for _, port in scan_hosts_async(
+        target, ports, concurrency=concurrency, rate=rate, timeout=timeout, checkpoint=checkpoint
+    ):
+        found.add(port)
+    return [port for port in ports if port in found]
+
+def scan_hosts(targets, ports, on_result=None, concurrency=DEFAULT_CONCURRENCY,
+               rate=None, host_rate=None, timeout=None):
+    """
+    Scans every (host, port) pair across `targets` (IPs, hostnames or CIDR
+    ranges such as "10.0.0.0/24"). on_result(host, port) is called for each
+    open port as soon as it is found. Returns {host: PortSet of open ports}.
+    """
+    async def collect():
+        results = {}
+        async for host, port in scan_hosts_async(
+            targets, ports, concurrency=concurrency, rate=rate, host_rate=host_rate, timeout=timeout
+        ):
+            if host not in results:
+                results[host] = PortSet()
+            results[host].add(port)
+            if on_result:
+                on_result(host, port)
+        return results
+
+    return asyncio.run(collect())
+
+async def scan_hosts_async(targets, ports, concurrency=DEFAULT_CONCURRENCY,
+                           rate=None, host_rate=None, timeout=None, banners=False,
+                           checkpoint=None):
+    """
+    Async generator yielding (host, port) for open ports as they are found,
+    or (host, port, banner) with banners=True.
+
+    Probes are interleaved port-major (every host's port 1, then every
+    host's port 2, ...) so load is spread across hosts rather than hammering
+    one at a time. `concurrency` is the global in-flight budget, `rate` a
+    global cap on connects per second and `host_rate` a per-host cap.
+
+    Banners are read over the connection the probe opened, in a separate
+    task, so a slow service never holds up a connect worker.
+
+    With a checkpoint.ScanCheckpoint, progress is saved as probes complete;
+    on resume, results found by the earlier run are yielded first and
+    finished probes are skipped.
+    """
+    hosts = list(dict.fromkeys([host async for host in expand_targets(targets)]))
+    ports = list(ports)
+    concurrency = clamp_concurrency(concurrency, banners)
+    engine = ConnectEngine(concurrency=concurrency, rate=rate, timeout=timeout, host_rate=host_rate)
+
+    start = 0
+    if checkpoint:
+        checkpoint.begin(hosts, ports, banners)
+        start = checkpoint.done_upto
+        for result in list(checkpoint.results):
+            yield result
+
+    total = len(hosts) * len(ports)
+    # Probe i is host i % len(hosts) on port i // len(hosts)
+    probes = (
+        (i, hosts[i % len(hosts)], ports[i // len(hosts)])
+        for i in range(start, total)
+        if not (checkpoint and checkpoint.is_done(i))
+    )
+    found = asyncio.Queue(maxsize=concurrency)
+
+    def done(index, result=None):
+        if checkpoint:
+            checkpoint.mark(index, result)
+
+    banner_slots = asyncio.Semaphore(BANNER_CONCURRENCY)
+    banner_tasks = set()
+
+    async def read_banner(index, sock, host, port):
+        try:
+            banner = await grab_banner_async(sock, host, port)
+        finally:
+            banner_slots.release()
+        done(index, (host, port, banner))
+        await found.put((host, port, banner))
+
+    async def worker():
+        # Workers share one probe generator; next() never awaits, so each
+        # pair is handed out exactly once.
+        for index, host, port in probes:
+            if not banners:
+                if await engine.probe(host, port):
+                    done(index, (host, port))
+                    await found.put((host, port))
+                else:
+                    done(index)
+                continue
+
+            sock = await engine.connect(host, port)
+            if sock is None:
+                done(index)
+                continue
+            await banner_slots.acquire()
+            task = asyncio.create_task(read_banner(index, sock, host, port))
+            banner_tasks.add(task)
+            task.add_done_callback(banner_tasks.discard)
+
+    async def run_workers():
+        try:
+            await asyncio.gather(*workers)
+            while banner_tasks:
+                await asyncio.gather(*banner_tasks)
+        finally:
+            await found.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, total - start))]
+    runner = asyncio.create_task(run_workers())
+    try:
+        while True:
+            item = await found.get()
+            if item is None:
+                break
+            yield item
+        await runner
+    finally:
+        for task in workers + list(banner_tasks):
+            task.cancel()
+        runner.cancel()
+        if checkpoint:
+            checkpoint.flush()
+
+async def expand_targets(targets):
+    """Yields host addresses for IPs, CIDR ranges and hostnames."""
+    if isinstance(targets, str):
+        targets = [targets]
+
+    for target in targets:
+        try:
+            network = ipaddress.ip_network(target, strict=False)
+        except ValueError:
+            try:
+                yield await resolve(target)
+            except OSError as e:
+                # One bad name shouldn't abort the rest of the sweep
+                print(f"[!] Cannot resolve {target}: {e}")
+            continue
+
+        if network.num_addresses == 1:
+            yield str(network.network_address)
+        else:
+            for host in network.hosts():
+                yield str(host)
+
+def clamp_concurrency(concurrency, banners=False):
+    """
+    Caps the connect budget so it fits in the process's open-file limit.
+    Banner sockets stay open after their connect slot is released, so with
+    banners=True up to BANNER_CONCURRENCY more descriptors are reserved.
+    """
+    if resource is None:
+        return concurrency
+
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft == resource.RLIM_INFINITY:
+        return concurrency
+
+    headroom = FD_HEADROOM + (BANNER_CONCURRENCY if banners else 0)
+    return max(1, min(concurrency, soft - headroom))
+
+def parse_ports(spec):
+    """Parses "22,80,8000-8100" into a sorted list of ports."""
+    ports = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            ports.update(range(int(start), int(end) + 1))
+        else:
+            ports.add(int(part))
+    return sorted(p for p in ports if 0 < p < 65536)
+
+async def resolve(target):
+    # Resolve once up front instead of once per port
+    loop = asyncio.get_running_loop()
+    infos = await loop.getaddrinfo(target, None, type=socket.SOCK_STREAM)
+    return infos[0][4][0]
+
+
+class ConnectEngine:
+    """
+    Non-blocking TCP connect prober shared by all probes of a scan.
+
+    Thousands of connects can be in flight; their number is bounded by a
+    semaphore and, optionally, their start rate by token buckets (global and
+    per host). The connect timeout follows the RTT measured to each host
+    (RFC 6298 style smoothing) so fast networks aren't stuck waiting a full
+    second on filtered ports, and a fast LAN host doesn't shrink the timeout
+    used for a distant one.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, rate=None, timeout=None, host_rate=None):
+        self.slots = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rate) if rate else None
+        self.host_rate = host_rate
+        self.host_limiters = {}
+        # Host address -> RttEstimator
+        self.rtts = {}
+        self.fixed_timeout = timeout
+
+    def timeout_for(self, address):
+        if self.fixed_timeout:
+            return self.fixed_timeout
+        rtt = self.rtts.get(address)
+        if rtt is None:
+            return INITIAL_TIMEOUT
+        return rtt.timeout()
+
+    async def probe(self, address, port):
+        """Returns True if the port accepted a connection."""
+        sock = await self.connect(address, port)
+        if sock is None:
+            return False
+        sock.close()
+        return True
+
+    async def connect(self, address, port):
+        """
+        Returns the connected non-blocking socket, or None if the port is
+        closed or filtered. The caller owns the socket and must close it.
+        """
+        if self.host_rate:
+            # Wait on the per-host cap before taking a global slot
+            if address not in self.host_limiters:
+                self.host_limiters[address] = RateLimiter(self.host_rate)
+            await self.host_limiters[address].acquire()
+
+        async with self.slots:
+            if self.limiter:
+                await self.limiter.acquire()
+
+            loop = asyncio.get_running_loop()
+            family = socket.AF_INET6 if ":" in address else socket.AF_INET
+            sock = await self._socket(family)
+            if sock is None:
+                return None
+
+            started = time.monotonic()
+            try:
+                await asyncio.wait_for(loop.sock_connect(sock, (address, port)), timeout=self.timeout_for(address))
+            except asyncio.TimeoutError:
+                sock.close()
+                return None
+            except ConnectionRefusedError:
+                # A quick RST is as good an RTT sample as a handshake
+                self._sample(address, time.monotonic() - started)
+                sock.close()
+                return None
+            except OSError:
+                sock.close()
+                return None
+
+            self._sample(address, time.monotonic() - started)
+            return sock
+
+    async def _socket(self, family):
+        # Out of descriptors (other processes, or a limit lowered mid-scan):
+        # wait for sockets to be closed rather than failing the sweep
+        while True:
+            try:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+            except OSError as e:
+                if e.errno in FD_EXHAUSTED:
+                    await asyncio.sleep(FD_RETRY_DELAY)
+                    continue
+                return None
+            sock.setblocking(False)
+            return sock
+
+    def _sample(self, address, elapsed):
+        if self.fixed_timeout:
+            return
+        rtt = self.rtts.get(address)
+        if rtt is None:
+            rtt = self.rtts[address] = RttEstimator()
+        rtt.add(elapsed)
+
+
+class RttEstimator:
+    """Smoothed RTT / variance tracker giving a connect timeout."""
+
+    def __init__(self, initial=INITIAL_TIMEOUT, minimum=MIN_TIMEOUT, maximum=MAX_TIMEOUT):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.srtt = None
+        self.rttvar = None
+
+    def add(self, sample):
+        if self.srtt is None:
+            self.srtt = sample
+            self.rttvar = sample / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - sample)
+            self.srtt = 0.875 * self.srtt + 0.125 * sample
+
+    def timeout(self):
+        if self.srtt is None:
+            return self.initial
+        return min(self.maximum, max(self.minimum, self.srtt + 4 * self.rttvar))
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate / 10))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
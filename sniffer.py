@@ -5,4 +5,8 @@ def packet_callback(packet):
     print(packet.summary())
 
 def start_sniffer(interface):
-    sniff(iface=interface, prn=packet_callback, store=False)
\ No newline at end of file
+    sniff(iface=interface, prn=packet_callback, store=False)
+
+def read_pcap(path):
+    # Streams a pcap/pcapng file through the same callback as live capture
+    sniff(offline=path, prn=packet_callback, store=False)